@@ -1,6 +1,8 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
+import asyncio
 import os
 
 # Load environment variables from .env file
@@ -14,9 +16,11 @@ if not GOOGLE_CREDENTIALS_PATH:
 # Local imports
 from app.routes import chats
 from app.utils.config import config
+from app.utils.compression import SelectiveGZipMiddleware
+from app.utils.usage import usage_tracker, usage_flush_loop
 
-# Initialize the FastAPI app
-app = FastAPI()
+# Initialize the FastAPI app (orjson for all JSON responses)
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # CORS configuration to allow frontend requests from specific origins
 app.add_middleware(
@@ -27,9 +31,27 @@ app.add_middleware(
     allow_headers=config.CORS_ALLOW_HEADERS,
 )
 
+# Compress large payloads such as long histories and session lists
+# (never /chat/stream, whose chunks must reach the client as they are flushed)
+app.add_middleware(
+    SelectiveGZipMiddleware,
+    paths=[f"{config.API_PREFIX}{path}" for path in ("/history", "/sessions", "/export")],
+    minimum_size=config.GZIP_MINIMUM_SIZE
+)
+
 # Include the router for the chat functionality
 app.include_router(chats.router, prefix=config.API_PREFIX, tags=["chat"])
 
+# Periodically flush aggregated provider usage
+@app.on_event("startup")
+async def start_usage_flusher():
+    app.state.usage_flush_task = asyncio.create_task(usage_flush_loop())
+
+@app.on_event("shutdown")
+async def stop_usage_flusher():
+    app.state.usage_flush_task.cancel()
+    await asyncio.to_thread(usage_tracker.flush)
+
 # Default route for testing
 @app.get("/")
 def read_root():
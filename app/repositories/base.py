@@ -0,0 +1,73 @@
+# app/repositories/base.py
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+
+class PartialUsageWrite(Exception):
+    """
+    Raised by apply_usage when only some rows were applied; `failed_rows`
+    are the rows that were not, so callers can retry just those
+    """
+
+    def __init__(self, failed_rows: List[dict]):
+        super().__init__(f"{len(failed_rows)} usage rows failed to apply")
+        self.failed_rows = failed_rows
+
+
+class ChatRepository(ABC):
+    """
+    Storage interface for chat history and session metadata.
+    History documents use the shape produced by history_schema.build_history_doc.
+    Keys returned by the iterators are opaque, backend-specific strings.
+    """
+
+    @abstractmethod
+    def save_turn(self, history_doc: dict, session_id: str, user_id: str, title: str,
+                  created_at: datetime, preview: str = "") -> None:
+        """
+        Stores one chat turn, creating its session if it doesn't exist and
+        updating the session summary (last_message_at, message_count, last_preview).
+        An empty preview (e.g. a system row) keeps the session's current one.
+        """
+
+    @abstractmethod
+    def insert_history_many(self, history_docs: List[dict]) -> None:
+        """Bulk-inserts history documents in a single batch"""
+
+    @abstractmethod
+    def recent_history(self, session_id: str, limit: int = 10) -> List[dict]:
+        """Latest history documents of a session, newest first"""
+
+    @abstractmethod
+    def list_sessions(self, user_id: str) -> List[dict]:
+        """Sessions of a user with their summary fields, most recently active first"""
+
+    @abstractmethod
+    def backfill_session_summaries(self) -> int:
+        """Recomputes session summaries from stored history; returns sessions updated"""
+
+    @abstractmethod
+    def iter_sessions(self, user_id: str, start_key: Optional[str] = None) -> Iterator[dict]:
+        """Sessions of a user in storage order, from start_key inclusive; each has a `key`"""
+
+    @abstractmethod
+    def iter_messages(self, session_id: str, after_key: Optional[str] = None) -> Iterator[dict]:
+        """History documents of a session in storage order, after after_key; each has a `key`"""
+
+    @abstractmethod
+    def is_valid_key(self, key: str) -> bool:
+        """Whether key could have been produced by this backend"""
+
+    @abstractmethod
+    def apply_usage(self, rows: List[dict]) -> None:
+        """
+        Adds aggregated usage counters, upserting one row per (user_id, session_id, provider).
+        Raises PartialUsageWrite when some rows were applied and others were not.
+        """
+
+    @abstractmethod
+    def get_usage(self, user_id: Optional[str] = None, session_id: Optional[str] = None,
+                  limit: int = 50) -> List[dict]:
+        """Usage rows matching the filters, heaviest (by total_tokens) first"""
@@ -0,0 +1,18 @@
+# app/repositories/factory.py
+
+from functools import lru_cache
+from app.repositories.base import ChatRepository
+from app.utils.config import config
+
+
+@lru_cache(maxsize=None)
+def get_repository() -> ChatRepository:
+    """Returns the process-wide repository selected by STORAGE_BACKEND"""
+    backend = config.STORAGE_BACKEND
+    if backend == "mongo":
+        from app.repositories.mongo import create_mongo_repository
+        return create_mongo_repository()
+    if backend == "sqlite":
+        from app.repositories.sqlite import create_sqlite_repository
+        return create_sqlite_repository()
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend!r} (expected 'mongo' or 'sqlite')")
@@ -0,0 +1,205 @@
+# app/repositories/mongo.py
+
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator, List, Optional
+from bson import ObjectId
+import pymongo
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+from app.repositories.base import ChatRepository, PartialUsageWrite
+from app.services.history_schema import HISTORY_READ_PROJECTION, get_llm_response, make_preview
+from app.utils.config import config
+from app.utils.deadline import stage_timeout
+
+
+@contextmanager
+def _deadline_scope(stage: str):
+    """Applies the remaining request budget to every Mongo operation in the block"""
+    timeout = stage_timeout(stage)
+    if timeout is None:
+        yield
+        return
+    with pymongo.timeout(timeout):
+        yield
+
+
+class MongoChatRepository(ChatRepository):
+    """MongoDB backend; the client connects lazily on first use"""
+
+    def __init__(self, uri: str, db_name: str = "chatbot_db", batch_size: int = 500):
+        self.uri = uri
+        self.db_name = db_name
+        self.batch_size = batch_size
+        self._client = None
+
+    @property
+    def db(self):
+        if self._client is None:
+            self._client = MongoClient(self.uri)
+            self._ensure_indexes(self._client[self.db_name])
+        return self._client[self.db_name]
+
+    def _ensure_indexes(self, db) -> None:
+        """Creates the indexes every query path relies on (no-op when they exist)"""
+        indexes = [
+            ("chat_history", [("session_id", 1), ("timestamp", -1)], {}),
+            ("chat_sessions", [("id", 1)], {"unique": True}),
+            ("chat_sessions", [("user_id", 1), ("last_message_at", -1)], {}),
+            ("usage_stats", [("user_id", 1), ("session_id", 1), ("provider", 1)], {"unique": True}),
+        ]
+        for collection, keys, options in indexes:
+            try:
+                db[collection].create_index(keys, **options)
+            except Exception as e:
+                print(f"[ERROR - ensure index {collection} {keys}]: {e}")
+
+    @property
+    def history(self):
+        return self.db["chat_history"]
+
+    @property
+    def sessions(self):
+        return self.db["chat_sessions"]
+
+    def save_turn(self, history_doc: dict, session_id: str, user_id: str, title: str,
+                  created_at: datetime, preview: str = "") -> None:
+        with _deadline_scope("persistence"):
+            self.history.insert_one(history_doc)
+
+            # One atomic upsert creates the session or bumps its summary. Turns
+            # may commit out of order, so the summary only moves forward in time
+            at = history_doc["timestamp"]
+            self.sessions.update_one(
+                {"id": session_id},
+                [{"$set": {
+                    "user_id": {"$ifNull": ["$user_id", {"$literal": user_id}]},
+                    "title": {"$ifNull": ["$title", {"$literal": title}]},
+                    "created_at": {"$ifNull": ["$created_at", created_at]},
+                    "message_count": {"$add": [{"$ifNull": ["$message_count", 0]}, 1]},
+                    "last_preview": {"$cond": [
+                        {"$and": [{"$gte": [at, {"$ifNull": ["$last_message_at", at]}]}, bool(preview)]},
+                        {"$literal": preview},
+                        {"$ifNull": ["$last_preview", ""]}
+                    ]},
+                    "last_message_at": {"$max": ["$last_message_at", at]}
+                }}],
+                upsert=True
+            )
+
+    def insert_history_many(self, history_docs: List[dict]) -> None:
+        if history_docs:
+            self.history.insert_many(history_docs, ordered=False)
+
+    def recent_history(self, session_id: str, limit: int = 10) -> List[dict]:
+        with _deadline_scope("history read"):
+            return list(
+                self.history
+                .find({"session_id": session_id}, HISTORY_READ_PROJECTION)
+                .sort("timestamp", -1)
+                .limit(limit)
+            )
+
+    def list_sessions(self, user_id: str) -> List[dict]:
+        with _deadline_scope("session list"):
+            return list(
+                self.sessions
+                .find({"user_id": user_id}, {"_id": 0, "id": 1, "title": 1, "created_at": 1,
+                                             "last_message_at": 1, "message_count": 1, "last_preview": 1})
+                .sort("last_message_at", -1)
+            )
+
+    def iter_sessions(self, user_id: str, start_key: Optional[str] = None) -> Iterator[dict]:
+        query = {"user_id": user_id}
+        if start_key:
+            query["_id"] = {"$gte": ObjectId(start_key)}
+
+        cursor = (
+            self.sessions
+            .find(query, {"id": 1, "title": 1, "created_at": 1})
+            .sort("_id", 1)
+            .batch_size(self.batch_size)
+        )
+        for session in cursor:
+            session["key"] = str(session.pop("_id"))
+            yield session
+
+    def iter_messages(self, session_id: str, after_key: Optional[str] = None) -> Iterator[dict]:
+        query = {"session_id": session_id}
+        if after_key:
+            query["_id"] = {"$gt": ObjectId(after_key)}
+
+        cursor = (
+            self.history
+            .find(query, HISTORY_READ_PROJECTION)
+            .sort("_id", 1)
+            .batch_size(self.batch_size)
+        )
+        for msg in cursor:
+            msg["key"] = str(msg.pop("_id"))
+            yield msg
+
+    def is_valid_key(self, key: str) -> bool:
+        return ObjectId.is_valid(key)
+
+    @property
+    def usage(self):
+        return self.db["usage_stats"]
+
+    def apply_usage(self, rows: List[dict]) -> None:
+        if not rows:
+            return
+        now = datetime.utcnow()
+        operations = []
+        for row in rows:
+            key = {"user_id": row["user_id"], "session_id": row["session_id"], "provider": row["provider"]}
+            counters = {field: value for field, value in row.items() if field not in key}
+            operations.append(UpdateOne(key, {"$inc": counters, "$set": {"updated_at": now}}, upsert=True))
+        try:
+            self.usage.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # Unordered: every operation without a write error was applied,
+            # so only those rows may be retried without double counting
+            failed = sorted({error["index"] for error in e.details.get("writeErrors", [])})
+            if failed:
+                raise PartialUsageWrite([rows[index] for index in failed]) from e
+
+    def get_usage(self, user_id: Optional[str] = None, session_id: Optional[str] = None,
+                  limit: int = 50) -> List[dict]:
+        query = {}
+        if user_id:
+            query["user_id"] = user_id
+        if session_id:
+            query["session_id"] = session_id
+        return list(self.usage.find(query, {"_id": 0}).sort("total_tokens", -1).limit(limit))
+
+
+    def backfill_session_summaries(self) -> int:
+        updated = 0
+        pending = []
+        pipeline = [
+            {"$sort": {"session_id": 1, "timestamp": 1}},
+            {"$group": {
+                "_id": "$session_id",
+                "message_count": {"$sum": 1},
+                "last_message_at": {"$last": "$timestamp"},
+                "llm_response": {"$last": "$llm_response"},
+                "llm_response_z": {"$last": "$llm_response_z"}
+            }}
+        ]
+        for summary in self.history.aggregate(pipeline, allowDiskUse=True, batchSize=self.batch_size):
+            pending.append(UpdateOne({"id": summary["_id"]}, {"$set": {
+                "last_message_at": summary["last_message_at"],
+                "message_count": summary["message_count"],
+                "last_preview": make_preview(get_llm_response(summary))
+            }}))
+            if len(pending) >= self.batch_size:
+                updated += self.sessions.bulk_write(pending, ordered=False).modified_count
+                pending.clear()
+        if pending:
+            updated += self.sessions.bulk_write(pending, ordered=False).modified_count
+        return updated
+
+
+def create_mongo_repository() -> MongoChatRepository:
+    return MongoChatRepository(config.MONGO_URI, config.MONGO_DB_NAME, config.EXPORT_BATCH_SIZE)
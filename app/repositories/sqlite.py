@@ -0,0 +1,279 @@
+# app/repositories/sqlite.py
+
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Iterator, List, Optional
+from app.repositories.base import ChatRepository
+from app.services.history_schema import get_llm_response, make_preview
+from app.utils.config import config
+from app.utils.deadline import check_deadline
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_history (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    user_id TEXT,
+    user_prompt TEXT,
+    user_prompt_z BLOB,
+    translated_prompt TEXT,
+    llm_response TEXT,
+    llm_response_z BLOB,
+    final_response TEXT,
+    language TEXT NOT NULL DEFAULT 'en',
+    timestamp TEXT NOT NULL,
+    schema_version INTEGER NOT NULL DEFAULT 2
+);
+CREATE INDEX IF NOT EXISTS idx_history_session_time ON chat_history (session_id, timestamp);
+
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    rowid_key INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    user_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    last_message_at TEXT,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    last_preview TEXT NOT NULL DEFAULT ''
+);
+
+CREATE TABLE IF NOT EXISTS usage_stats (
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    calls INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    total_tokens INTEGER NOT NULL DEFAULT 0,
+    translated_chars INTEGER NOT NULL DEFAULT 0,
+    latency_ms REAL NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, session_id, provider)
+);
+CREATE INDEX IF NOT EXISTS idx_usage_total ON usage_stats (total_tokens);
+"""
+
+# Session summary columns added after the first release, for existing databases
+SESSION_SUMMARY_COLUMNS = {
+    "last_message_at": "TEXT",
+    "message_count": "INTEGER NOT NULL DEFAULT 0",
+    "last_preview": "TEXT NOT NULL DEFAULT ''"
+}
+SESSION_ACTIVITY_INDEX = (
+    "CREATE INDEX IF NOT EXISTS idx_sessions_user_activity ON chat_sessions (user_id, last_message_at)"
+)
+
+# Columns of chat_history that map 1:1 onto history document keys
+HISTORY_COLUMNS = (
+    "session_id", "user_id", "user_prompt", "user_prompt_z", "translated_prompt",
+    "llm_response", "llm_response_z", "final_response", "language", "timestamp", "schema_version"
+)
+BLOB_COLUMNS = ("user_prompt_z", "llm_response_z")
+
+# Statements are kept as constants so sqlite3's statement cache reuses them
+INSERT_HISTORY_SQL = (
+    f"INSERT INTO chat_history ({', '.join(HISTORY_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in HISTORY_COLUMNS)})"
+)
+UPSERT_SESSION_SQL = (
+    "INSERT INTO chat_sessions (id, user_id, title, created_at, last_message_at, message_count, last_preview) "
+    "VALUES (?, ?, ?, ?, ?, 1, ?) "
+    "ON CONFLICT (id) DO UPDATE SET last_message_at = MAX(last_message_at, excluded.last_message_at), "
+    "message_count = message_count + 1, "
+    "last_preview = CASE WHEN excluded.last_message_at >= last_message_at AND excluded.last_preview != '' "
+    "THEN excluded.last_preview ELSE last_preview END"
+)
+READ_COLUMNS = (
+    "id, user_prompt, user_prompt_z, translated_prompt, llm_response, llm_response_z, "
+    "final_response, language, timestamp"
+)
+RECENT_HISTORY_SQL = (
+    f"SELECT {READ_COLUMNS} FROM chat_history WHERE session_id = ? "
+    "ORDER BY timestamp DESC LIMIT ?"
+)
+ITER_MESSAGES_SQL = (
+    f"SELECT {READ_COLUMNS} FROM chat_history WHERE session_id = ? AND id > ? ORDER BY id"
+)
+LIST_SESSIONS_SQL = (
+    "SELECT id, title, created_at, last_message_at, message_count, last_preview FROM chat_sessions "
+    "WHERE user_id = ? ORDER BY last_message_at DESC"
+)
+SESSION_SUMMARIES_SQL = (
+    "SELECT session_id, llm_response, llm_response_z, timestamp, message_count FROM ("
+    "  SELECT session_id, llm_response, llm_response_z, timestamp,"
+    "         ROW_NUMBER() OVER (PARTITION BY session_id ORDER BY timestamp DESC) AS rn,"
+    "         COUNT(*) OVER (PARTITION BY session_id) AS message_count"
+    "  FROM chat_history"
+    ") WHERE rn = 1"
+)
+BACKFILL_SESSION_SQL = (
+    "UPDATE chat_sessions SET last_message_at = ?, message_count = ?, last_preview = ? WHERE id = ?"
+)
+ITER_SESSIONS_SQL = (
+    "SELECT rowid_key, id, title, created_at FROM chat_sessions "
+    "WHERE user_id = ? AND rowid_key >= ? ORDER BY rowid_key"
+)
+
+USAGE_COUNTERS = ("calls", "prompt_tokens", "completion_tokens", "total_tokens", "translated_chars", "latency_ms")
+APPLY_USAGE_SQL = (
+    f"INSERT INTO usage_stats (user_id, session_id, provider, {', '.join(USAGE_COUNTERS)}, updated_at) "
+    f"VALUES (?, ?, ?, {', '.join('?' for _ in USAGE_COUNTERS)}, ?) "
+    "ON CONFLICT (user_id, session_id, provider) DO UPDATE SET "
+    + ", ".join(f"{field} = {field} + excluded.{field}" for field in USAGE_COUNTERS)
+    + ", updated_at = excluded.updated_at"
+)
+USAGE_SELECT_SQL = "SELECT * FROM usage_stats"
+
+
+def _to_row(doc: dict) -> tuple:
+    row = []
+    for column in HISTORY_COLUMNS:
+        value = doc.get(column)
+        if column == "timestamp" and isinstance(value, datetime):
+            value = value.isoformat()
+        elif column in BLOB_COLUMNS and value is not None:
+            value = bytes(value)
+        row.append(value)
+    return tuple(row)
+
+
+def _to_doc(row: sqlite3.Row) -> dict:
+    """Row -> history document, leaving out NULL columns like Mongo would"""
+    doc = {key: row[key] for key in row.keys() if row[key] is not None}
+    doc["key"] = str(doc.pop("id"))
+    if "timestamp" in doc:
+        doc["timestamp"] = datetime.fromisoformat(doc["timestamp"])
+    return doc
+
+
+def _to_session(row: sqlite3.Row) -> dict:
+    session = dict(row)
+    session["created_at"] = datetime.fromisoformat(session["created_at"])
+    if session.get("last_message_at"):
+        session["last_message_at"] = datetime.fromisoformat(session["last_message_at"])
+    if "rowid_key" in session:
+        session["key"] = str(session.pop("rowid_key"))
+    return session
+
+
+class SQLiteChatRepository(ChatRepository):
+    """Embedded SQLite backend (WAL mode) for single-node deployments"""
+
+    def __init__(self, path: str, batch_size: int = 500):
+        self.path = path
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, cached_statements=256)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._upgrade_schema()
+
+    def _upgrade_schema(self) -> None:
+        existing = {row["name"] for row in self._conn.execute("PRAGMA table_info(chat_sessions)")}
+        with self._conn:
+            for column, definition in SESSION_SUMMARY_COLUMNS.items():
+                if column not in existing:
+                    self._conn.execute(f"ALTER TABLE chat_sessions ADD COLUMN {column} {definition}")
+            self._conn.execute(SESSION_ACTIVITY_INDEX)
+
+    def save_turn(self, history_doc: dict, session_id: str, user_id: str, title: str,
+                  created_at: datetime, preview: str = "") -> None:
+        check_deadline("persistence")
+        # History row and session summary go out in one transaction
+        with self._lock, self._conn:
+            self._conn.execute(INSERT_HISTORY_SQL, _to_row(history_doc))
+            self._conn.execute(UPSERT_SESSION_SQL, (
+                session_id, user_id, title, created_at.isoformat(),
+                history_doc["timestamp"].isoformat(), preview
+            ))
+
+    def insert_history_many(self, history_docs: List[dict]) -> None:
+        if not history_docs:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(INSERT_HISTORY_SQL, [_to_row(doc) for doc in history_docs])
+
+    def recent_history(self, session_id: str, limit: int = 10) -> List[dict]:
+        check_deadline("history read")
+        with self._lock:
+            rows = self._conn.execute(RECENT_HISTORY_SQL, (session_id, limit)).fetchall()
+        return [_to_doc(row) for row in rows]
+
+    def list_sessions(self, user_id: str) -> List[dict]:
+        check_deadline("session list")
+        with self._lock:
+            rows = self._conn.execute(LIST_SESSIONS_SQL, (user_id,)).fetchall()
+        return [_to_session(row) for row in rows]
+
+    def backfill_session_summaries(self) -> int:
+        with self._lock:
+            summaries = self._conn.execute(SESSION_SUMMARIES_SQL).fetchall()
+        params = [
+            (row["timestamp"], row["message_count"], make_preview(get_llm_response(dict(row))), row["session_id"])
+            for row in summaries
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(BACKFILL_SESSION_SQL, params)
+        return len(params)
+
+    def _iter_batches(self, sql: str, params: tuple):
+        # Long exports read through their own connection; WAL lets them run
+        # alongside writers without holding the shared connection's lock.
+        # StreamingResponse advances (and finalises) the generator from
+        # whichever worker thread is free, one call at a time, so the
+        # connection must not be pinned to the thread that opened it.
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            conn.close()
+
+    def iter_sessions(self, user_id: str, start_key: Optional[str] = None) -> Iterator[dict]:
+        for row in self._iter_batches(ITER_SESSIONS_SQL, (user_id, int(start_key or 0))):
+            yield _to_session(row)
+
+    def iter_messages(self, session_id: str, after_key: Optional[str] = None) -> Iterator[dict]:
+        for row in self._iter_batches(ITER_MESSAGES_SQL, (session_id, int(after_key or 0))):
+            yield _to_doc(row)
+
+    def is_valid_key(self, key: str) -> bool:
+        return key.isdigit()
+
+    def apply_usage(self, rows: List[dict]) -> None:
+        if not rows:
+            return
+        now = datetime.utcnow().isoformat()
+        params = [
+            (row["user_id"], row["session_id"], row["provider"],
+             *(row.get(field, 0) for field in USAGE_COUNTERS), now)
+            for row in rows
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(APPLY_USAGE_SQL, params)
+
+    def get_usage(self, user_id: Optional[str] = None, session_id: Optional[str] = None,
+                  limit: int = 50) -> List[dict]:
+        clauses, params = [], []
+        if user_id:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if session_id:
+            clauses.append("session_id = ?")
+            params.append(session_id)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"{USAGE_SELECT_SQL}{where} ORDER BY total_tokens DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, (*params, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+
+def create_sqlite_repository() -> SQLiteChatRepository:
+    return SQLiteChatRepository(config.SQLITE_PATH, config.EXPORT_BATCH_SIZE)
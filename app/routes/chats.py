@@ -1,20 +1,31 @@
 # app/routes/chats.py
 
-from fastapi import APIRouter, HTTPException, Query, Request
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 import asyncio
+import orjson
+import zlib
 from app.services.chat_processing import (
     process_chat,
     get_chat_history_by_session,
     save_chat_history,
     get_user_chat_sessions,
-    stream_chat_response
+    stream_chat_response,
+    export_user_archive,
+    decode_export_cursor,
+    get_usage_report
 )
+from app.utils.config import config
+from app.utils.streaming import coalesce_chunks
+from app.utils.deadline import DeadlineExceeded, start_deadline
 
 router = APIRouter()
 
+# Appended to a stream cut off by its deadline, so clients can tell it apart from a complete answer
+STREAM_TRUNCATED_MARKER = "\n\n[Response truncated: time limit reached]"
+
 # Request structure for chat input
 class ChatRequest(BaseModel):
     prompt: str
@@ -35,41 +46,52 @@ class ChatSessionSummary(BaseModel):
     id: str
     title: str
     created_at: str
+    last_message_at: str = ""
+    message_count: int = 0
+    last_preview: str = ""
 
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, x_request_timeout: Optional[str] = Header(None)):
     """
     Handles user input:
     - Translates if needed.
     - Sends to LLM.
     - Saves in DB with session/user context.
+    The whole request is bounded by X-Request-Timeout (seconds) or the default deadline.
     """
+    deadline = start_deadline(x_request_timeout)
     try:
         print(f"[User Input in {request.language} | Session: {request.session_id} | User: {request.user_id}]: {request.prompt}")
 
-        # Process chat and get all necessary outputs from LLM
-        result = process_chat({
+        # Process chat and get all necessary outputs from LLM; the worker thread
+        # sees the deadline and stops at its next stage once it has passed
+        result = await asyncio.wait_for(asyncio.to_thread(process_chat, {
             "prompt": request.prompt,
             "language": request.language,
-            "session_id": request.session_id
-        })
+            "session_id": request.session_id,
+            "user_id": request.user_id
+        }), timeout=deadline.remaining())
 
         print(f"[LLM Response]: {result['final_response']}")
 
         # Save chat using already available data
-        save_chat_history(
+        await asyncio.wait_for(asyncio.to_thread(
+            save_chat_history,
             session_id=request.session_id,
             user_id=request.user_id,
             user_message=request.prompt,
             translated_prompt=result["translated_prompt"],
             llm_response=result["llm_response"],
-            final_response=result["final_response"],
             language=request.language
-        )
+        ), timeout=deadline.remaining())
 
-        return ChatResponse(response=result["final_response"])
+        # Trusted internal data: skip response_model validation
+        return ORJSONResponse({"response": result["final_response"]})
 
+    except (DeadlineExceeded, asyncio.TimeoutError) as e:
+        print(f"[TIMEOUT /chat]: Session {request.session_id} - {str(e) or 'deadline passed'}")
+        raise HTTPException(status_code=504, detail="Chat request timed out.")
     except Exception as e:
         print(f"[ERROR /chat]: {str(e)}")
         raise HTTPException(status_code=500, detail="Something went wrong during chat.")
@@ -80,32 +102,45 @@ async def chat_stream(request: Request):
     """
     Streaming chat response endpoint.
     Compatible with frontend streaming (e.g., EventSource or fetch streaming).
+    Bounded by X-Request-Timeout or STREAM_TIMEOUT_SECONDS; an answer cut off
+    by the deadline ends with STREAM_TRUNCATED_MARKER.
     """
     try:
+        start_deadline(
+            request.headers.get("x-request-timeout"),
+            default=config.STREAM_TIMEOUT_SECONDS,
+            maximum=config.MAX_STREAM_TIMEOUT_SECONDS
+        )
         body = await request.json()
         prompt = body.get("prompt", "")
         session_id = body.get("session_id")
         language = body.get("language", "en")
+        user_id = body.get("user_id")
 
         if not session_id:
             raise ValueError("Session ID is required")
 
         print(f"[Stream Start | Session: {session_id} | Lang: {language}]: {prompt}")
 
-        # Async generator to stream data
+        # Async generator to stream data, coalescing token deltas per the flush policy
         async def event_generator():
             try:
-                async for chunk in stream_chat_response({
+                async for chunk in coalesce_chunks(stream_chat_response({
                     "prompt": prompt,
                     "language": language,
-                    "session_id": session_id
-                }):
-                    if chunk.strip():  # Ensure empty chunks aren't streamed
+                    "session_id": session_id,
+                    "user_id": user_id
+                })):
+                    if chunk:  # Ensure empty chunks aren't streamed
                         yield chunk
             except asyncio.CancelledError:
                 # Gracefully handle when the stream is cancelled
                 print(f"[STREAM CANCELLED]: Session {session_id}")
                 return
+            except (DeadlineExceeded, asyncio.TimeoutError):
+                # Headers are already sent, so the truncation is marked in the body
+                print(f"[STREAM DEADLINE EXCEEDED]: Session {session_id}")
+                yield STREAM_TRUNCATED_MARKER
 
         # Return StreamingResponse for frontend to consume the chunks
         return StreamingResponse(event_generator(), media_type="text/plain")
@@ -116,26 +151,116 @@ async def chat_stream(request: Request):
 
 
 @router.get("/history", response_model=HistoryResponse)
-async def get_history(session_id: str = Query(..., description="Chat session ID")):
+async def get_history(
+    session_id: str = Query(..., description="Chat session ID"),
+    x_request_timeout: Optional[str] = Header(None)
+):
     """
     Retrieves the chat history for a particular session.
     """
+    start_deadline(x_request_timeout)
     try:
         history = get_chat_history_by_session(session_id)
-        return {"history": history}
+        return ORJSONResponse({"history": history})
+    except DeadlineExceeded as e:
+        print(f"[TIMEOUT /history]: {str(e)}")
+        raise HTTPException(status_code=504, detail="Fetching chat history timed out.")
     except Exception as e:
         print(f"[ERROR /history]: {str(e)}")
         raise HTTPException(status_code=500, detail="Error fetching chat history.")
 
 
 @router.get("/sessions", response_model=List[ChatSessionSummary])
-async def list_sessions(user_id: str = Query(..., description="User ID to filter sessions")):
+async def list_sessions(
+    user_id: str = Query(..., description="User ID to filter sessions"),
+    x_request_timeout: Optional[str] = Header(None)
+):
     """
     Retrieves a list of sessions for a particular user.
     """
+    start_deadline(x_request_timeout)
     try:
         sessions = get_user_chat_sessions(user_id)
-        return sessions
+        return ORJSONResponse(sessions)
+    except DeadlineExceeded as e:
+        print(f"[TIMEOUT /sessions]: {str(e)}")
+        raise HTTPException(status_code=504, detail="Fetching chat sessions timed out.")
     except Exception as e:
         print(f"[ERROR /sessions]: {str(e)}")
         raise HTTPException(status_code=500, detail="Unable to fetch chat sessions.")
+
+
+def _export_stream(first_line, lines):
+    """
+    Yields an export that already produced its first line. Headers are sent
+    by then, so a storage error is logged and ends the stream with an error line;
+    the client resumes from the cursor of the last line it received.
+    """
+    if first_line is None:
+        return
+    yield first_line
+    try:
+        yield from lines
+    except Exception as e:
+        print(f"[ERROR /export stream]: {str(e)}")
+        yield orjson.dumps({"type": "error", "detail": "Export interrupted; resume from the last cursor."}) + b"\n"
+
+
+def _gzip_stream(lines):
+    """Gzip-compresses an iterable of byte chunks on the fly"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for line in lines:
+        data = compressor.compress(line)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@router.get("/export")
+async def export_archive(
+    user_id: str = Query(..., description="User whose archive is exported"),
+    cursor: Optional[str] = Query(None, description="Resume token from the last received line"),
+    gzip: bool = Query(False, description="Gzip-compress the NDJSON stream")
+):
+    """
+    Streams every session and message of a user as NDJSON.
+    """
+    if cursor:
+        try:
+            decode_export_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        # Read the first line up front so errors opening the export still get a 500
+        lines = export_user_archive(user_id, cursor)
+        first_line = await asyncio.to_thread(next, lines, None)
+    except Exception as e:
+        print(f"[ERROR /export]: {str(e)}")
+        raise HTTPException(status_code=500, detail="Unable to export chat archive.")
+
+    body = _export_stream(first_line, lines)
+    if gzip:
+        return StreamingResponse(
+            _gzip_stream(body),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f'attachment; filename="{user_id}.ndjson.gz"'}
+        )
+    return StreamingResponse(body, media_type="application/x-ndjson")
+
+
+@router.get("/usage")
+async def get_usage(
+    user_id: Optional[str] = Query(None, description="Filter by user ID"),
+    session_id: Optional[str] = Query(None, description="Filter by session ID"),
+    limit: int = Query(50, ge=1, le=1000, description="Maximum rows returned")
+):
+    """
+    Returns aggregated token / translation usage per user, session and provider,
+    heaviest first. Figures lag by up to one flush interval.
+    """
+    try:
+        return ORJSONResponse(get_usage_report(user_id=user_id, session_id=session_id, limit=limit))
+    except Exception as e:
+        print(f"[ERROR /usage]: {str(e)}")
+        raise HTTPException(status_code=500, detail="Unable to fetch usage.")
@@ -0,0 +1,17 @@
+# app/services/backfill_sessions.py
+#
+# Fills last_message_at, message_count and last_preview on existing sessions
+# from their chat history. Run once after upgrading; new turns keep the
+# summaries current on their own.
+# Usage: python -m app.services.backfill_sessions
+
+from app.repositories.factory import get_repository
+
+
+def main():
+    updated = get_repository().backfill_session_summaries()
+    print(f"[BACKFILL DONE] {updated} session summaries updated")
+
+
+if __name__ == "__main__":
+    main()
@@ -38,6 +38,9 @@ class ChatSessionSummary(BaseModel):
     id: str
     title: str
     created_at: str
+    last_message_at: str = ""
+    message_count: int = 0
+    last_preview: str = ""
 
 # Stop request structure
 class StopRequest(BaseModel):
@@ -72,7 +75,6 @@ async def chat(request: ChatRequest):
             user_message=request.prompt,
             translated_prompt=result["translated_prompt"],
             llm_response=result["llm_response"],
-            final_response=result["final_response"],
             language=request.language
         )
 
@@ -1,68 +1,92 @@
 # app/services/chat_processing.py
 
-from pymongo import MongoClient
 from datetime import datetime
-from app.utils.translate import translate_text, detect_language
-from app.utils.llm import query_llm, format_llm_response, stream_llm_response
+from app.utils.config import config
+from app.utils.translate import translate_text, detect_language, matches_language
+from app.utils.llm import query_llm, stream_llm_response
+from app.utils.usage import usage_context
+from app.repositories.factory import get_repository
+from app.services.history_schema import (
+    build_history_doc,
+    get_user_prompt,
+    get_final_response,
+    render_html,
+    make_preview
+)
 from pydantic import BaseModel
 from typing import List, Dict, Optional
-import os
 import asyncio
+import base64
+import re
 import uuid
+import orjson
 from collections import defaultdict
 
-# Mongo URI from .env
-MongoURI = os.getenv("MongoURI")
-client = MongoClient(MongoURI)
-db = client["chatbot_db"]
-chat_history_collection = db["chat_history"]
-chat_sessions_collection = db["chat_sessions"]
-
 # Global dictionary to track active streams and their cancellation events
 active_streams: Dict[str, Dict[str, asyncio.Event]] = defaultdict(dict)
 
-# Chat History Document Schema
+# Translated streams are sent to Translate a sentence or line at a time;
+# single-token deltas would cost one request each and lose their context
+SENTENCE_END_PATTERN = re.compile(r"[.!?।。！？]['\")\]]*$")
+
+def at_translation_boundary(pending: str, next_delta: str) -> bool:
+    """True when `pending` is a complete unit to translate before `next_delta`"""
+    if len(pending) >= config.TRANSLATE_SEGMENT_CHARS:
+        return True
+    if pending.count("```") % 2:
+        return False  # inside a code block; translate_text skips whole fences only
+    return pending.endswith("\n") or (bool(SENTENCE_END_PATTERN.search(pending)) and next_delta[:1].isspace())
+
+# Chat History Document Schema (compact v2, see history_schema.py):
+# translated_prompt is omitted when equal to user_prompt, large bodies are
+# stored as `<field>_z` zlib blobs and final_response is rendered on read.
 class ChatHistory(BaseModel):
     session_id: str
     user_id: str
     user_prompt: str
-    translated_prompt: str
+    translated_prompt: Optional[str] = None
     llm_response: str
-    final_response: str
     language: str
     timestamp: datetime
+    schema_version: int = 2
 
-# Chat Session Metadata Schema
+# Chat Session Metadata Schema (summary fields are maintained on every saved turn)
 class ChatSession(BaseModel):
     id: str
     user_id: str
     title: str
     created_at: datetime
+    last_message_at: Optional[datetime] = None
+    message_count: int = 0
+    last_preview: str = ""
 
 def save_chat_history(session_id: str, user_id: str, user_message: str, translated_prompt: str, 
-                     llm_response: str, final_response: str, language: str) -> None:
-    """Save chat history and create session if it doesn't exist"""
+                     llm_response: str, language: str, final_response: Optional[str] = None) -> None:
+    """
+    Save chat history and create session if it doesn't exist.
+    System rows pass their display text as final_response and no llm_response,
+    so it is neither rendered as markdown nor used as the session preview.
+    """
     try:
-        chat_entry = ChatHistory(
+        # Documents are built directly (shape matches ChatHistory / ChatSession)
+        now = datetime.utcnow()
+        get_repository().save_turn(
+            build_history_doc(
+                session_id=session_id,
+                user_id=user_id,
+                user_prompt=user_message,
+                translated_prompt=translated_prompt,
+                llm_response=llm_response,
+                language=language,
+                timestamp=now,
+                final_response=final_response
+            ),
             session_id=session_id,
             user_id=user_id,
-            user_prompt=user_message,
-            translated_prompt=translated_prompt,
-            llm_response=llm_response,
-            final_response=final_response,
-            language=language,
-            timestamp=datetime.utcnow()
+            title=user_message.strip()[:50] or "Untitled Chat",
+            created_at=now,
+            preview=make_preview(llm_response)
         )
-        chat_history_collection.insert_one(chat_entry.dict())
-
-        if not chat_sessions_collection.find_one({"id": session_id}):
-            session_doc = ChatSession(
-                id=session_id,
-                user_id=user_id,
-                title=user_message.strip()[:50] or "Untitled Chat",
-                created_at=datetime.utcnow()
-            )
-            chat_sessions_collection.insert_one(session_doc.dict())
 
         print(f"[DB] Chat saved for session: {session_id}")
     except Exception as e:
@@ -72,11 +96,11 @@ def save_chat_history(session_id: str, user_id: str, user_message: str, translat
 def get_chat_history_by_session(session_id: str) -> List[dict]:
     """Get last 10 messages for a session"""
     try:
-        messages = chat_history_collection.find({"session_id": session_id}).sort("timestamp", -1).limit(10)
+        messages = get_repository().recent_history(session_id, limit=10)
         return [
             {
-                "user": msg.get("user_prompt", ""),
-                "ai": msg.get("final_response", "")
+                "user": get_user_prompt(msg),
+                "ai": get_final_response(msg)
             }
             for msg in messages
         ]
@@ -85,14 +109,17 @@ def get_chat_history_by_session(session_id: str) -> List[dict]:
         raise
 
 def get_user_chat_sessions(user_id: str) -> List[dict]:
-    """Get all chat sessions for a user"""
+    """Get all chat sessions for a user, most recently active first"""
     try:
-        sessions = chat_sessions_collection.find({"user_id": user_id}).sort("created_at", -1)
+        sessions = get_repository().list_sessions(user_id)
         return [
             {
                 "id": session.get("id"),
                 "title": session.get("title", "Untitled"),
-                "created_at": session.get("created_at").isoformat() if session.get("created_at") else ""
+                "created_at": session.get("created_at").isoformat() if session.get("created_at") else "",
+                "last_message_at": session.get("last_message_at").isoformat() if session.get("last_message_at") else "",
+                "message_count": session.get("message_count", 0),
+                "last_preview": session.get("last_preview", "")
             }
             for session in sessions
         ]
@@ -100,6 +127,77 @@ def get_user_chat_sessions(user_id: str) -> List[dict]:
         print(f"[ERROR - get_user_chat_sessions]: {e}")
         raise
 
+def encode_export_cursor(session_key: str, message_key: Optional[str] = None) -> str:
+    """Opaque resume token pointing just after a session header or message"""
+    raw = f"{session_key}:{message_key or ''}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_export_cursor(token: str) -> tuple:
+    """Inverse of encode_export_cursor; raises ValueError on malformed tokens"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        session_key, message_key = raw.split(":")
+    except Exception:
+        raise ValueError("Invalid export cursor")
+
+    repository = get_repository()
+    if not repository.is_valid_key(session_key) or (message_key and not repository.is_valid_key(message_key)):
+        raise ValueError("Invalid export cursor")
+    return session_key, message_key or None
+
+def export_user_archive(user_id: str, cursor: Optional[str] = None):
+    """
+    Yields a user's sessions and messages as NDJSON lines (bytes).
+    Reads batched storage cursors so memory stays constant.
+    Every line carries a `cursor` token that resumes right after it.
+    """
+    resume_session, resume_message = decode_export_cursor(cursor) if cursor else (None, None)
+    repository = get_repository()
+
+    for session in repository.iter_sessions(user_id, start_key=resume_session):
+        session_key = session["key"]
+        resuming = session_key == resume_session
+
+        # The header was already delivered if we resume inside this session
+        if not resuming:
+            yield orjson.dumps({
+                "type": "session",
+                "id": session.get("id"),
+                "title": session.get("title", "Untitled"),
+                "created_at": session.get("created_at"),
+                "cursor": encode_export_cursor(session_key)
+            }) + b"\n"
+
+        after_key = resume_message if resuming else None
+        for msg in repository.iter_messages(session.get("id"), after_key=after_key):
+            yield orjson.dumps({
+                "type": "message",
+                "session_id": session.get("id"),
+                "user": get_user_prompt(msg),
+                "ai": get_final_response(msg),
+                "language": msg.get("language", "en"),
+                "timestamp": msg.get("timestamp"),
+                "cursor": encode_export_cursor(session_key, msg["key"])
+            }) + b"\n"
+
+def get_usage_report(user_id: Optional[str] = None, session_id: Optional[str] = None, limit: int = 50) -> List[dict]:
+    """Aggregated provider usage, heaviest first"""
+    try:
+        return get_repository().get_usage(user_id=user_id, session_id=session_id, limit=limit)
+    except Exception as e:
+        print(f"[ERROR - get_usage_report]: {e}")
+        raise
+
+def get_generation_mode(language: str) -> str:
+    """
+    'native' or 'translate' for a target language. English always takes the
+    translate path, so non-English prompts reach the model in English; the
+    English answer itself is never sent back through translation.
+    """
+    if language == "en":
+        return "translate"
+    return config.GENERATION_MODES.get(language, config.DEFAULT_GENERATION_MODE)
+
 def process_chat(request: dict) -> dict:
     """Non-streaming chat processing"""
     try:
@@ -110,22 +208,40 @@ def process_chat(request: dict) -> dict:
         if not session_id:
             raise ValueError("Session ID is required")
 
-        detected_language = detect_language(prompt)
-        translated_prompt = prompt if detected_language == language else translate_text(prompt, "en")
+        # Attribute provider usage of this request to the user/session
+        usage_context.set((request.get("user_id"), session_id))
+
+        native = get_generation_mode(language) == "native"
+        if native:
+            # The model answers in the user's language; translation is only a fallback
+            translated_prompt, llm_language = prompt, language
+        else:
+            # Round trip: English prompt in, English answer translated back
+            detected_language = detect_language(prompt)
+            translated_prompt = prompt if detected_language == "en" else translate_text(prompt, "en")
+            llm_language = "en"
 
         llm_output = query_llm(
             translated_prompt, 
             model="openrouter-mistral", 
             session_id=session_id, 
-            language=language, 
+            language=llm_language, 
             format="raw"
         )
 
         if not isinstance(llm_output, str):
             raise ValueError("LLM did not return a valid string response")
 
-        raw_response = llm_output if language == "en" or detected_language == language else translate_text(llm_output, language)
-        final_response = format_llm_response(raw_response, format="html")
+        if not native and language != "en":
+            raw_response = translate_text(llm_output, language)
+        elif native and not matches_language(llm_output, language):
+            print(f"[NATIVE FALLBACK] Output not in '{language}', translating")
+            raw_response = translate_text(llm_output, language)
+        else:
+            raw_response = llm_output
+
+        # Same renderer as the read path, so /history hits the warm cache
+        final_response = render_html(raw_response, language)
 
         print("[FINAL HTML OUTPUT]", final_response)
 
@@ -149,19 +265,44 @@ async def stream_chat_response(request: dict):
     if not session_id:
         raise ValueError("Session ID is required")
 
+    usage_context.set((user_id, session_id))
+
     # Create unique stream ID and cancellation event
     stream_id = str(uuid.uuid4())
     cancel_event = asyncio.Event()
     active_streams[session_id][stream_id] = cancel_event
 
     try:
-        detected_language = detect_language(prompt)
-        translated_prompt = prompt if detected_language == language else translate_text(prompt, "en")
+        native = get_generation_mode(language) == "native"
+        if native:
+            llm_prompt, llm_language = prompt, language
+        else:
+            detected_language = detect_language(prompt)
+            llm_prompt = prompt if detected_language == "en" else translate_text(prompt, "en")
+            llm_language = "en"
+
+        # Native mode holds back the first LANGUAGE_CHECK_CHARS to verify the
+        # output language, then either passes through or falls back to translation
+        translate_chunks = not native and language != "en"
+        checked = not native
+        head = []
+        pending = []  # deltas awaiting translation
+
+        def resolve_head() -> str:
+            nonlocal translate_chunks, checked
+            checked = True
+            text = "".join(head)
+            head.clear()
+            if not matches_language(text, language):
+                print(f"[NATIVE FALLBACK] Stream not in '{language}', translating - Session: {session_id}")
+                translate_chunks = True
+                return translate_text(text, target_lang=language)
+            return text
 
         async for chunk in stream_llm_response(
-            translated_prompt,
+            llm_prompt,
             session_id=session_id,
-            language=language,
+            language=llm_language,
             cancel_event=cancel_event
         ):
             # Check if cancellation was requested
@@ -169,9 +310,30 @@ async def stream_chat_response(request: dict):
                 print(f"[STREAM CANCELLED] Session: {session_id}")
                 break
 
-            translated_chunk = chunk if language == "en" or detected_language == language else translate_text(chunk, target_lang=language)
-            if translated_chunk.strip():
-                yield translated_chunk
+            if not checked:
+                head.append(chunk)
+                if sum(len(part) for part in head) < config.LANGUAGE_CHECK_CHARS:
+                    continue
+                chunk = resolve_head()
+            elif translate_chunks:
+                ready = "".join(pending)
+                pending.append(chunk)
+                if not ready or not at_translation_boundary(ready, chunk):
+                    continue
+                pending[:] = [chunk]
+                chunk = translate_text(ready, target_lang=language)
+
+            if chunk:  # keep whitespace/newline deltas for the flush policy
+                yield chunk
+
+        if head:
+            tail = resolve_head()
+            if tail:
+                yield tail
+        if pending:
+            tail = translate_text("".join(pending), target_lang=language)
+            if tail:
+                yield tail
 
     except asyncio.CancelledError:
         print(f"[STREAM CANCELLED EXTERNALLY] Session: {session_id}")
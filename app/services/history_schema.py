@@ -0,0 +1,128 @@
+# app/services/history_schema.py
+
+import re
+import zlib
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+from bson import Binary
+from app.utils.config import config
+from app.utils.llm import format_llm_response
+
+# Version 2 drops `final_response` (rendered on read), omits `translated_prompt`
+# when it equals `user_prompt` and stores large bodies as zlib blobs.
+HISTORY_SCHEMA_VERSION = 2
+
+# Fields that may be stored compressed under a `<field>_z` key
+COMPRESSIBLE_FIELDS = ("user_prompt", "llm_response")
+
+
+def _pack(doc: dict, field: str, value: str) -> None:
+    """Stores value under field, or compressed under field_z when large"""
+    raw = value.encode("utf-8")
+    if len(raw) >= config.HISTORY_COMPRESS_MIN_BYTES:
+        packed = zlib.compress(raw)
+        if len(packed) < len(raw):
+            doc[f"{field}_z"] = Binary(packed)
+            return
+    doc[field] = value
+
+
+def _unpack(doc: dict, field: str) -> str:
+    """Reads a possibly compressed field"""
+    packed = doc.get(f"{field}_z")
+    if packed is not None:
+        return zlib.decompress(packed).decode("utf-8")
+    return doc.get(field, "")
+
+
+def build_history_doc(session_id: str, user_id: str, user_prompt: str, translated_prompt: str,
+                      llm_response: str, language: str, timestamp: Optional[datetime] = None,
+                      final_response: Optional[str] = None) -> dict:
+    """
+    Builds a compact chat_history document. `final_response` is only stored
+    for rows whose display text is not rendered from llm_response (system rows).
+    """
+    doc = {
+        "session_id": session_id,
+        "user_id": user_id,
+        "language": language,
+        "timestamp": timestamp or datetime.utcnow(),
+        "schema_version": HISTORY_SCHEMA_VERSION
+    }
+    _pack(doc, "user_prompt", user_prompt)
+    _pack(doc, "llm_response", llm_response)
+    if translated_prompt != user_prompt:
+        doc["translated_prompt"] = translated_prompt
+    if final_response is not None:
+        doc["final_response"] = final_response
+    return doc
+
+
+@lru_cache(maxsize=config.HTML_RENDER_CACHE_SIZE)
+def render_html(llm_response: str, language: str = "en") -> str:
+    """Memoized markdown -> HTML render, identical to what used to be stored"""
+    return format_llm_response(llm_response, format="html", language=language)
+
+
+def get_user_prompt(doc: dict) -> str:
+    return _unpack(doc, "user_prompt")
+
+
+def get_translated_prompt(doc: dict) -> str:
+    if "translated_prompt" in doc:
+        return doc["translated_prompt"]
+    return get_user_prompt(doc)
+
+
+def get_llm_response(doc: dict) -> str:
+    return _unpack(doc, "llm_response")
+
+
+def get_final_response(doc: dict) -> str:
+    """Legacy documents keep their stored HTML; compact ones render on read"""
+    if "final_response" in doc:
+        return doc["final_response"]
+    return render_html(get_llm_response(doc), doc.get("language", "en"))
+
+
+MARKDOWN_NOISE_PATTERN = re.compile(r"```.*?(```|$)|[`*_#>\[\]]", re.DOTALL)
+
+
+def make_preview(text: str) -> str:
+    """Plain-text snippet of a response for the sessions sidebar"""
+    text = " ".join(MARKDOWN_NOISE_PATTERN.sub(" ", text or "").split())
+    limit = config.SESSION_PREVIEW_CHARS
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+def compact_legacy_doc(doc: dict) -> dict:
+    """
+    Rewrites a version 1 document into the compact schema.
+    `final_response` is only dropped when it can be re-rendered exactly.
+    """
+    user_prompt = doc.get("user_prompt", "")
+    llm_response = doc.get("llm_response", "")
+    compact = build_history_doc(
+        session_id=doc.get("session_id"),
+        user_id=doc.get("user_id"),
+        user_prompt=user_prompt,
+        translated_prompt=doc.get("translated_prompt", user_prompt),
+        llm_response=llm_response,
+        language=doc.get("language", "en"),
+        timestamp=doc.get("timestamp")
+    )
+    compact["_id"] = doc["_id"]
+
+    final_response = doc.get("final_response")
+    if final_response is not None and final_response != render_html(llm_response, compact["language"]):
+        compact["final_response"] = final_response
+    return compact
+
+
+# Projection covering every stored field of both schema versions
+HISTORY_READ_PROJECTION = {
+    "user_prompt": 1, "user_prompt_z": 1,
+    "llm_response": 1, "llm_response_z": 1,
+    "final_response": 1, "language": 1, "timestamp": 1
+}
@@ -0,0 +1,61 @@
+# app/services/migrate_history.py
+#
+# Rewrites legacy chat_history documents into the compact schema.
+# Only the Mongo backend holds legacy documents; SQLite starts compact.
+# Usage: python -m app.services.migrate_history [--batch-size 500] [--dry-run]
+
+import argparse
+import bson
+from pymongo import ReplaceOne
+from app.repositories.mongo import create_mongo_repository
+from app.services.history_schema import compact_legacy_doc, HISTORY_SCHEMA_VERSION
+
+
+def migrate_history(batch_size: int = 500, dry_run: bool = False) -> dict:
+    """Migrates documents in batches and returns byte/document counts"""
+    chat_history_collection = create_mongo_repository().history
+    stats = {"documents": 0, "bytes_before": 0, "bytes_after": 0}
+    pending = []
+
+    def flush():
+        if pending and not dry_run:
+            chat_history_collection.bulk_write(pending, ordered=False)
+        pending.clear()
+
+    legacy_docs = chat_history_collection.find(
+        {"schema_version": {"$ne": HISTORY_SCHEMA_VERSION}}
+    ).batch_size(batch_size)
+
+    for doc in legacy_docs:
+        compact = compact_legacy_doc(doc)
+        stats["documents"] += 1
+        stats["bytes_before"] += len(bson.encode(doc))
+        stats["bytes_after"] += len(bson.encode(compact))
+        pending.append(ReplaceOne({"_id": doc["_id"]}, compact))
+
+        if len(pending) >= batch_size:
+            flush()
+            print(f"[MIGRATE] {stats['documents']} documents processed")
+
+    flush()
+    stats["bytes_saved"] = stats["bytes_before"] - stats["bytes_after"]
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact the chat_history collection")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Only report the bytes that would be saved")
+    args = parser.parse_args()
+
+    stats = migrate_history(batch_size=args.batch_size, dry_run=args.dry_run)
+    saved_pct = (stats["bytes_saved"] / stats["bytes_before"] * 100) if stats["bytes_before"] else 0.0
+    print(
+        f"[MIGRATE {'DRY RUN' if args.dry_run else 'DONE'}] {stats['documents']} documents, "
+        f"{stats['bytes_before']} -> {stats['bytes_after']} bytes "
+        f"({stats['bytes_saved']} saved, {saved_pct:.1f}%)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+# app/utils/compression.py
+
+from urllib.parse import parse_qs
+from starlette.middleware.gzip import GZipMiddleware
+
+TRUTHY = {"1", "true", "yes", "on"}
+
+
+class SelectiveGZipMiddleware:
+    """
+    Gzips responses of the listed paths only. Streaming chat output must not
+    go through GZipMiddleware (it buffers until the end), and /export?gzip=true
+    is already compressed by the route.
+    """
+
+    def __init__(self, app, paths, minimum_size: int = 1024):
+        self.app = app
+        self.paths = set(paths)
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size)
+
+    def _should_compress(self, scope) -> bool:
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            return False
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        return not any(value.lower() in TRUTHY for value in query.get("gzip", []))
+
+    async def __call__(self, scope, receive, send):
+        if self._should_compress(scope):
+            await self.gzip(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
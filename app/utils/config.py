@@ -18,6 +18,68 @@ class Config:
     CORS_ALLOW_METHODS: list = ["*"]
     CORS_ALLOW_HEADERS: list = ["*"]
 
+    # Response compression (bytes); smaller payloads are sent uncompressed
+    GZIP_MINIMUM_SIZE: int = int(os.getenv("GZIP_MINIMUM_SIZE", "1024"))
+
+    # Storage backend: "mongo" or "sqlite" (embedded, single-node deployments)
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "mongo").lower()
+    MONGO_URI: str = os.getenv("MongoURI")
+    MONGO_DB_NAME: str = os.getenv("MONGO_DB_NAME", "chatbot_db")
+    SQLITE_PATH: str = os.getenv("SQLITE_PATH", "chatbot.db")
+
+    # Archive export: documents fetched per Mongo cursor round trip
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
+    # Streaming flush policy: "passthrough", "coalesce" or "adaptive"
+    STREAM_FLUSH_POLICY: str = os.getenv("STREAM_FLUSH_POLICY", "adaptive").lower()
+    STREAM_FLUSH_MIN_BYTES: int = int(os.getenv("STREAM_FLUSH_MIN_BYTES", "64"))
+    STREAM_FLUSH_MAX_BYTES: int = int(os.getenv("STREAM_FLUSH_MAX_BYTES", "1024"))
+    STREAM_FLUSH_DELAY_MS: int = int(os.getenv("STREAM_FLUSH_DELAY_MS", "50"))
+
+    # Generation mode per language: "native" (model answers in the user's
+    # language, translation only as fallback) or "translate" (English round trip).
+    # GENERATION_MODES overrides per language, e.g. "hi:native,ta:translate".
+    DEFAULT_GENERATION_MODE: str = os.getenv("DEFAULT_GENERATION_MODE", "native").lower()
+    GENERATION_MODES: dict = {
+        lang.strip(): mode.strip().lower()
+        for lang, _, mode in (item.partition(":") for item in os.getenv("GENERATION_MODES", "").split(","))
+        if mode
+    }
+    # Characters of streamed output checked before committing to native mode
+    LANGUAGE_CHECK_CHARS: int = int(os.getenv("LANGUAGE_CHECK_CHARS", "120"))
+
+    # Request deadlines (seconds); clients may ask for less via X-Request-Timeout
+    REQUEST_TIMEOUT_SECONDS: float = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "30"))
+    MAX_REQUEST_TIMEOUT_SECONDS: float = float(os.getenv("MAX_REQUEST_TIMEOUT_SECONDS", "120"))
+    # /chat/stream runs as long as the answer keeps streaming, so it has its own limits
+    STREAM_TIMEOUT_SECONDS: float = float(os.getenv("STREAM_TIMEOUT_SECONDS", "300"))
+    MAX_STREAM_TIMEOUT_SECONDS: float = float(os.getenv("MAX_STREAM_TIMEOUT_SECONDS", "600"))
+    # Upper bound for a single provider attempt
+    PROVIDER_TIMEOUT_SECONDS: float = float(os.getenv("PROVIDER_TIMEOUT_SECONDS", "10"))
+    # Fallback providers are skipped when less than this is left
+    MIN_FALLBACK_BUDGET_SECONDS: float = float(os.getenv("MIN_FALLBACK_BUDGET_SECONDS", "2"))
+
+    # Worker threads for Google Translate calls
+    TRANSLATE_WORKERS: int = int(os.getenv("TRANSLATE_WORKERS", "8"))
+    # Long-text translation: max characters per segment and per API request
+    TRANSLATE_SEGMENT_CHARS: int = int(os.getenv("TRANSLATE_SEGMENT_CHARS", "1500"))
+    TRANSLATE_BATCH_CHARS: int = int(os.getenv("TRANSLATE_BATCH_CHARS", "5000"))
+    # Entries kept in the shared translation cache
+    TRANSLATION_CACHE_SIZE: int = int(os.getenv("TRANSLATION_CACHE_SIZE", "5000"))
+
+    # Usage accounting: seconds between aggregated flushes to storage
+    USAGE_FLUSH_INTERVAL: float = float(os.getenv("USAGE_FLUSH_INTERVAL", "30"))
+
+    # Optional JSON file with per-language intent keywords (see app/utils/intents.py)
+    INTENT_KEYWORDS_PATH: str = os.getenv("INTENT_KEYWORDS_PATH")
+
+    # Chat history storage: bodies at least this large (bytes) are zlib-compressed
+    HISTORY_COMPRESS_MIN_BYTES: int = int(os.getenv("HISTORY_COMPRESS_MIN_BYTES", "2048"))
+    # Length of the last-message preview kept on each session
+    SESSION_PREVIEW_CHARS: int = int(os.getenv("SESSION_PREVIEW_CHARS", "100"))
+    # Number of rendered HTML responses kept in memory
+    HTML_RENDER_CACHE_SIZE: int = int(os.getenv("HTML_RENDER_CACHE_SIZE", "1024"))
+
     # Backend URL
     BACKEND_URL: str = os.getenv("BACKEND_URL")
 
@@ -0,0 +1,83 @@
+# app/utils/deadline.py
+
+import math
+import time
+from contextvars import ContextVar
+from typing import Optional
+from app.utils.config import config
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a pipeline stage has no time budget left"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Deadline exceeded before/during: {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    """Absolute point in (monotonic) time by which a request must finish"""
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+# Deadline of the request being served, set at the route
+current_deadline: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
+
+
+def start_deadline(header_value: Optional[str] = None, default: Optional[float] = None,
+                   maximum: Optional[float] = None) -> Deadline:
+    """
+    Creates the request deadline from an X-Request-Timeout header (seconds),
+    clamped to `maximum`, or `default` without a valid header. Both fall back
+    to the REQUEST_TIMEOUT_SECONDS / MAX_REQUEST_TIMEOUT_SECONDS settings.
+    """
+    seconds = default or config.REQUEST_TIMEOUT_SECONDS
+    if header_value:
+        try:
+            requested = float(header_value)
+        except ValueError:
+            requested = None
+        # "nan"/"inf" parse as floats but would defeat the clamp below
+        if requested is not None and math.isfinite(requested):
+            seconds = requested
+    seconds = min(max(seconds, 0.1), maximum or config.MAX_REQUEST_TIMEOUT_SECONDS)
+
+    deadline = Deadline(seconds)
+    current_deadline.set(deadline)
+    return deadline
+
+
+def check_deadline(stage: str) -> None:
+    deadline = current_deadline.get()
+    if deadline and deadline.expired:
+        raise DeadlineExceeded(stage)
+
+
+def stage_timeout(stage: str, cap: Optional[float] = None) -> Optional[float]:
+    """
+    Time budget for a stage: what is left of the request deadline, never more
+    than cap. Without a deadline the cap is returned unchanged.
+    """
+    deadline = current_deadline.get()
+    if deadline is None:
+        return cap
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        raise DeadlineExceeded(stage)
+    return min(remaining, cap) if cap else remaining
+
+
+def has_budget(seconds: float) -> bool:
+    """Whether at least `seconds` remain, e.g. before starting a fallback"""
+    deadline = current_deadline.get()
+    return deadline is None or deadline.remaining() >= seconds
+
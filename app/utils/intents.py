@@ -0,0 +1,94 @@
+# app/utils/intents.py
+
+import json
+import re
+from typing import Dict, FrozenSet, List
+from app.utils.config import config
+
+# Keyword lists per intent and language. INTENT_KEYWORDS_PATH may point to a
+# JSON file of the same shape; its lists replace the defaults they name.
+DEFAULT_INTENT_KEYWORDS: Dict[str, Dict[str, List[str]]] = {
+    "greeting": {
+        "en": ["hello", "hi", "hey", "good morning", "good afternoon", "good evening"],
+        "hi": ["namaste", "नमस्ते", "नमस्कार"],
+        "mr": ["namaskar", "नमस्कार"],
+        "es": ["hola", "buenos días", "buenas tardes", "buenas noches"],
+        "fr": ["bonjour", "salut", "bonsoir"],
+        "de": ["hallo", "guten morgen", "guten tag", "guten abend"]
+    },
+    "creator": {
+        "en": [
+            "who created you", "who is your creator", "who made you",
+            "your dad", "who is your dad", "your father", "who developed you"
+        ],
+        "hi": ["तुम्हें किसने बनाया", "आपको किसने बनाया", "tumhe kisne banaya", "aapko kisne banaya"],
+        "mr": ["तुला कोणी बनवले", "तुम्हाला कोणी बनवले"],
+        "es": ["quién te creó", "quién te hizo"],
+        "fr": ["qui t'a créé", "qui vous a créé"]
+    }
+}
+
+# Letters plus Indic combining marks, which Python's \w does not cover
+WORD_CHAR = r"[\w\u0900-\u0DFF]"
+
+
+def load_intent_keywords() -> Dict[str, Dict[str, List[str]]]:
+    keywords = {intent: dict(languages) for intent, languages in DEFAULT_INTENT_KEYWORDS.items()}
+    if config.INTENT_KEYWORDS_PATH:
+        with open(config.INTENT_KEYWORDS_PATH, encoding="utf-8") as f:
+            for intent, languages in json.load(f).items():
+                keywords.setdefault(intent, {}).update(languages)
+    return keywords
+
+
+class IntentMatcher:
+    """
+    Classifies a prompt into intents with one precompiled pattern per language.
+    Each pattern is a single alternation over every keyword of that language
+    (plus English) with word-boundary semantics, so "hi" matches "hi there"
+    but not "this" or "which".
+    """
+
+    def __init__(self, keywords: Dict[str, Dict[str, List[str]]]):
+        self._patterns = {}
+        self._intents_by_phrase = {}
+
+        languages = {lang for per_language in keywords.values() for lang in per_language}
+        for language in languages:
+            phrases = {}
+            for intent, per_language in keywords.items():
+                for phrase in per_language.get(language, []) + per_language.get("en", []):
+                    phrases.setdefault(self._normalize(phrase), set()).add(intent)
+
+            # Longest first so "good morning" wins over a shorter overlapping keyword
+            alternation = "|".join(
+                r"\s+".join(re.escape(word) for word in phrase.split())
+                for phrase in sorted(phrases, key=len, reverse=True)
+            )
+            self._patterns[language] = re.compile(
+                rf"(?<!{WORD_CHAR})(?:{alternation})(?!{WORD_CHAR})", re.IGNORECASE
+            )
+            self._intents_by_phrase[language] = {
+                phrase: frozenset(intents) for phrase, intents in phrases.items()
+            }
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return " ".join(text.lower().split())
+
+    def classify(self, text: str, language: str = "en") -> FrozenSet[str]:
+        if language not in self._patterns:
+            language = "en"
+        pattern = self._patterns.get(language)
+        if not pattern or not text:
+            return frozenset()
+
+        lookup = self._intents_by_phrase[language]
+        intents = set()
+        for match in pattern.finditer(text):
+            intents |= lookup.get(self._normalize(match.group(0)), frozenset())
+        return frozenset(intents)
+
+
+# Built once at import (application startup)
+intent_matcher = IntentMatcher(load_intent_keywords())
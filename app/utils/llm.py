@@ -7,7 +7,14 @@ import markdown2
 import asyncio
 import json
 import aiohttp
+import time
+from functools import lru_cache
+from typing import FrozenSet
 from langdetect import detect, LangDetectException
+from app.utils.usage import record_usage
+from app.utils.config import config
+from app.utils.intents import intent_matcher
+from app.utils.deadline import DeadlineExceeded, check_deadline, stage_timeout, has_budget
 
 # Load environment variables
 load_dotenv()
@@ -18,9 +25,17 @@ openrouter_api_key = os.getenv("OPENROUTER_API_KEY")
 session_model_map = {}  # key: session_id, value: model name
 streaming_task = None
 
+# Names used when telling the model which language to answer in
+LANGUAGE_NAMES = {
+    "en": "English", "hi": "Hindi", "mr": "Marathi", "bn": "Bengali", "gu": "Gujarati", "pa": "Punjabi",
+    "ta": "Tamil", "te": "Telugu", "kn": "Kannada", "ml": "Malayalam", "ur": "Urdu",
+    "es": "Spanish", "fr": "French", "de": "German", "it": "Italian", "pt": "Portuguese",
+    "ru": "Russian", "ar": "Arabic", "zh-cn": "Simplified Chinese", "ja": "Japanese", "ko": "Korean"
+}
+
 def detect_language(text: str) -> str:
-    simple_english_greetings = ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening']
-    if any(greeting in text.lower() for greeting in simple_english_greetings):
+    # Short English greetings confuse langdetect, so they short-circuit to English
+    if "greeting" in intent_matcher.classify(text, "en"):
         return "en"
     try:
         detected_language = detect(text)
@@ -32,49 +47,50 @@ def get_system_prompt(language: str = "en", user_prompt: str = "") -> str:
     """
     Builds the system prompt for the model based on language and user intent.
     """
-    simple_english_greetings = ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening']
-    creator_questions = [
-        "who created you", "who is your creator", "who made you",
-        "your dad", "who is your dad", "your father", "who developed you"
-    ]
-
-    user_message = user_prompt.strip().lower()
-    is_greeting = any(greet in user_message for greet in simple_english_greetings)
-    is_creator_question = any(q in user_message for q in creator_questions)
-
-    if language == "en":
-        base_prompt = (
-            "You are Nimbus, a smart, friendly, and creative AI assistant.\n"
-            "- Be helpful, natural, and professional.\n"
-            "- Use Markdown where appropriate (bold, lists, code blocks).\n"
-            "- Keep casual greetings short and warm (2–3 lines max).\n"
-            "- Never mention Aditya Pujari unless the user asks about your creator.\n"
-            "- Never mention companies like Mistral, OpenRouter, or Cohere.\n"
-            "- Avoid exaggerations or fake features (e.g., don't claim to set reminders).\n"
+    return build_system_prompt(language, intent_matcher.classify(user_prompt, language))
+
+@lru_cache(maxsize=256)
+def build_system_prompt(language: str, intents: FrozenSet[str]) -> str:
+    """Assembles the prompt for a (language, intent set); memoized"""
+    base_prompt = (
+        "You are Nimbus, a smart, friendly, and creative AI assistant.\n"
+        "- Be helpful, natural, and professional.\n"
+        "- Use Markdown where appropriate (bold, lists, code blocks).\n"
+        "- Keep casual greetings short and warm (2–3 lines max).\n"
+        "- Never mention Aditya Pujari unless the user asks about your creator.\n"
+        "- Never mention companies like Mistral, OpenRouter, or Cohere.\n"
+        "- Avoid exaggerations or fake features (e.g., don't claim to set reminders).\n"
+    )
+
+    if "greeting" in intents:
+        base_prompt += "\n\nUser greeted you. Respond kindly with 2–3 lines introducing yourself as Nimbus."
+
+    if "creator" in intents:
+        base_prompt += (
+            "\n\nIMPORTANT: The user is asking about your creator.\n"
+            "Always reply with ONLY this sentence:\n"
+            "'I was created by Aditya Pujari, a Computer Engineering student from G.H. Raisoni College of Engineering and Management, Pune.'\n"
+            "NEVER say you were made by a team, group, researchers, or engineers. NEVER add fake contributors.\n"
+            "If the user asks 'who are all that created you', make it clear that only Aditya Pujari is your sole creator.\n"
+            "Be respectful, concise, and never speculate.\n"
         )
 
-        if is_greeting:
-            base_prompt += "\n\nUser greeted you. Respond kindly with 2–3 lines introducing yourself as Nimbus."
-
-        if is_creator_question:
-            base_prompt += (
-                "\n\nIMPORTANT: The user is asking about your creator.\n"
-                "Always reply with ONLY this sentence:\n"
-                "'I was created by Aditya Pujari, a Computer Engineering student from G.H. Raisoni College of Engineering and Management, Pune.'\n"
-                "NEVER say you were made by a team, group, researchers, or engineers. NEVER add fake contributors.\n"
-                "If the user asks 'who are all that created you', make it clear that only Aditya Pujari is your sole creator.\n"
-                "Be respectful, concise, and never speculate.\n"
-            )
+    # The model answers directly in the target language (English included,
+    # so a prompt in another language doesn't pull the answer away from it)
+    language_name = LANGUAGE_NAMES.get(language, language)
+    base_prompt += (
+        f"\n\nIMPORTANT: Always reply in {language_name} (language code '{language}'), "
+        "even if the user writes in another language.\n"
+        "Keep code, commands, URLs and product names unchanged.\n"
+    )
 
-        return base_prompt
-
-    else:
-        return f"You are Nimbus, a helpful assistant. Reply in {language}."
+    return base_prompt
 
 def remove_foreign_language(text: str, target_language: str = "en") -> str:
+    # Only English output is scrubbed; for other targets non-ASCII text is the answer
     try:
         detected_language = detect(text)
-        if detected_language != target_language:
+        if target_language == "en" and detected_language != target_language:
             text = re.sub(r'[^\x00-\x7F]+', '', text)
     except LangDetectException:
         pass
@@ -104,8 +120,17 @@ def format_llm_response(text: str, format: str = "html", language: str = "en") -
     else:
         return text
 
+def _fall_back_to_groq(prompt: str, session_id: str, language: str, format: str) -> str:
+    """Retries on Groq unless too little of the request deadline is left"""
+    if not has_budget(config.MIN_FALLBACK_BUDGET_SECONDS):
+        raise DeadlineExceeded("groq fallback")
+    if session_id:
+        session_model_map[session_id] = "groq"
+    return query_llm(prompt, model="groq", session_id=session_id, language=language, format=format)
+
 def query_llm(prompt: str, model: str = "nimbus", session_id: str = None, language: str = None, format: str = "html") -> str:
     if not language:
+        check_deadline("language detection")
         language = detect_language(prompt)
 
     if session_id and session_id in session_model_map:
@@ -126,62 +151,93 @@ def query_llm(prompt: str, model: str = "nimbus", session_id: str = None, langua
                     ]
                 }
 
+                started = time.monotonic()
                 response = requests.post(
                     "https://openrouter.ai/api/v1/chat/completions",
                     headers=headers,
                     json=payload,
-                    timeout=10
+                    timeout=stage_timeout("openrouter", cap=config.PROVIDER_TIMEOUT_SECONDS)
                 )
                 response.raise_for_status()
                 result = response.json()
 
                 if "error" in result:
                     if result["error"].get("code") == 429:
-                        if session_id:
-                            session_model_map[session_id] = "groq"
-                        return query_llm(prompt, model="groq", session_id=session_id, language=language, format=format)
+                        return _fall_back_to_groq(prompt, session_id, language, format)
                     return f"OpenRouter Error: {result['error'].get('message', 'Unknown error')}"
 
+                # Error bodies arrive with status 200, so only record after the check above
+                usage = result.get("usage") or {}
+                record_usage(
+                    "openrouter",
+                    prompt_tokens=usage.get("prompt_tokens", 0),
+                    completion_tokens=usage.get("completion_tokens", 0),
+                    latency_ms=(time.monotonic() - started) * 1000,
+                    session_id=session_id
+                )
+
                 if "choices" in result and len(result["choices"]) > 0:
                     content = result["choices"][0]["message"]["content"]
                     content = content if content else "No response from model."
-                    content = remove_foreign_language(content, language)
-                    return format_llm_response(content, format)
+                    return format_llm_response(content, format, language)
 
                 return "Sorry, I couldn't understand the response from OpenRouter."
 
+            except DeadlineExceeded:
+                raise
             except Exception as e:
-                if session_id:
-                    session_model_map[session_id] = "groq"
-                return query_llm(prompt, model="groq", session_id=session_id, language=language, format=format)
+                return _fall_back_to_groq(prompt, session_id, language, format)
 
         elif model == "groq":
             try:
                 from groq import Groq
                 client = Groq()
+                started = time.monotonic()
                 response = client.chat.completions.create(
                     model="llama3-8b-8192",
                     messages=[
                         {"role": "system", "content": get_system_prompt(language, prompt)},
                         {"role": "user", "content": prompt}
-                    ]
+                    ],
+                    timeout=stage_timeout("groq", cap=config.PROVIDER_TIMEOUT_SECONDS)
+                )
+                usage = getattr(response, "usage", None)
+                record_usage(
+                    "groq",
+                    prompt_tokens=getattr(usage, "prompt_tokens", 0),
+                    completion_tokens=getattr(usage, "completion_tokens", 0),
+                    latency_ms=(time.monotonic() - started) * 1000,
+                    session_id=session_id
                 )
                 content = response.choices[0].message.content
                 if session_id:
                     session_model_map[session_id] = "groq"
-                return format_llm_response(content, format)
+                return format_llm_response(content, format, language)
+            except DeadlineExceeded:
+                raise
             except Exception as e:
                 return "Sorry, Our Nimbus is currently unavailable."
 
         else:
             import cohere
-            co = cohere.Client(cohere_api_key)
+            co = cohere.Client(cohere_api_key, timeout=stage_timeout("cohere", cap=config.PROVIDER_TIMEOUT_SECONDS))
+            started = time.monotonic()
             response = co.chat(model=model, message=prompt, temperature=0.5)
+            billed = getattr(getattr(response, "meta", None), "billed_units", None)
+            record_usage(
+                "cohere",
+                prompt_tokens=int(getattr(billed, "input_tokens", 0) or 0),
+                completion_tokens=int(getattr(billed, "output_tokens", 0) or 0),
+                latency_ms=(time.monotonic() - started) * 1000,
+                session_id=session_id
+            )
             if hasattr(response, "text"):
-                return format_llm_response(response.text.strip(), format)
+                return format_llm_response(response.text.strip(), format, language)
             else:
                 return "Sorry, Cohere did not return a valid response."
 
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         return "Sorry, I couldn't process your request."
 
@@ -191,8 +247,9 @@ async def stop_stream():
         streaming_task.cancel()
         streaming_task = None
 
-async def stream_llm_response(prompt: str, model: str = "openrouter-mistral", session_id: str = None, language: str = None):
-    global streaming_task
+async def stream_llm_response(prompt: str, model: str = "openrouter-mistral", session_id: str = None,
+                              language: str = None, cancel_event: asyncio.Event = None):
+    """Yields content deltas from OpenRouter's SSE stream as they arrive"""
     if not language:
         language = detect_language(prompt)
 
@@ -204,28 +261,56 @@ async def stream_llm_response(prompt: str, model: str = "openrouter-mistral", se
     payload = {
         "model": "mistralai/mistral-7b-instruct:free",
         "stream": True,
+        "usage": {"include": True},  # token counts arrive in the final chunk
         "messages": [
             {"role": "system", "content": get_system_prompt(language, prompt)},
             {"role": "user", "content": prompt}
         ]
     }
 
-    streaming_task = asyncio.create_task(_stream_llm_response_internal(url, headers, payload))
-    await streaming_task
-
-async def _stream_llm_response_internal(url, headers, payload):
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=headers, json=payload) as resp:
-            if resp.status != 200:
-                error_response = await resp.json()
-                return
+    started = time.monotonic()
+    usage = {}
+    # Only a stream OpenRouter accepted is a billable call; connection
+    # errors and non-200 responses are not recorded
+    accepted = False
+    # The whole stream (connect + body) must finish within the request deadline
+    timeout = aiohttp.ClientTimeout(total=stage_timeout("openrouter stream"))
+    try:
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.post(url, headers=headers, json=payload) as resp:
+                if resp.status != 200:
+                    print(f"[STREAM ERROR] OpenRouter returned {resp.status}: {await resp.text()}")
+                    return
+                accepted = True
+
+                async for line in resp.content:
+                    if cancel_event and cancel_event.is_set():
+                        return
+                    check_deadline("openrouter stream")
+
+                    line = line.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue  # SSE comments / keep-alives
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        return
 
-            async for line in resp.content:
-                if line:
                     try:
-                        data = json.loads(line.decode("utf-8"))
-                        if "choices" in data:
-                            for choice in data["choices"]:
-                                print(choice.get("text", ""))
+                        event = json.loads(data)
                     except json.JSONDecodeError:
                         continue
+
+                    usage = event.get("usage") or usage
+                    for choice in event.get("choices", []):
+                        delta = choice.get("delta", {}).get("content")
+                        if delta:
+                            yield delta
+    finally:
+        if accepted:
+            record_usage(
+                "openrouter",
+                prompt_tokens=usage.get("prompt_tokens", 0),
+                completion_tokens=usage.get("completion_tokens", 0),
+                latency_ms=(time.monotonic() - started) * 1000,
+                session_id=session_id
+            )
@@ -0,0 +1,121 @@
+# app/utils/streaming.py
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator
+from app.utils.config import config
+
+_DONE = object()
+
+
+@dataclass
+class FlushPolicy:
+    """
+    How streamed deltas are coalesced before being sent to the client.
+    - passthrough: every delta is sent as-is (one ASGI send per token)
+    - coalesce:    buffer up to `min_bytes` or `max_delay_ms`, whichever comes first
+    - adaptive:    like coalesce, but the byte target grows towards `max_bytes`
+                   while the client is slow to consume and shrinks when it keeps up
+    Newlines and code-fence markers always flush immediately (except in passthrough).
+    """
+    mode: str = "adaptive"
+    min_bytes: int = 64
+    max_bytes: int = 1024
+    max_delay_ms: int = 50
+
+    @classmethod
+    def from_config(cls) -> "FlushPolicy":
+        return cls(
+            mode=config.STREAM_FLUSH_POLICY,
+            min_bytes=config.STREAM_FLUSH_MIN_BYTES,
+            max_bytes=config.STREAM_FLUSH_MAX_BYTES,
+            max_delay_ms=config.STREAM_FLUSH_DELAY_MS
+        )
+
+
+def _at_boundary(tail: str, delta: str) -> bool:
+    """Whether `delta` ends a line or completes a code fence (`tail` ends with delta)"""
+    return delta.endswith("\n") or ("`" in delta and tail.rstrip().endswith("```"))
+
+
+async def coalesce_chunks(chunks: AsyncIterator[str], policy: FlushPolicy = None) -> AsyncIterator[str]:
+    """Re-chunks an async stream of text deltas according to the flush policy"""
+    policy = policy or FlushPolicy.from_config()
+
+    if policy.mode == "passthrough":
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    # A pump task feeds a queue so the delay timer can fire between deltas
+    # without cancelling the upstream generator
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump():
+        try:
+            async for chunk in chunks:
+                await queue.put(chunk)
+            await queue.put(_DONE)
+        except Exception as e:
+            await queue.put(e)
+
+    pump_task = asyncio.create_task(pump())
+    max_delay = policy.max_delay_ms / 1000
+    target = policy.min_bytes
+    buffer = []
+    buffered_bytes = 0
+    # Last few streamed characters, so a fence split across deltas ("``" + "`")
+    # is still seen as a boundary
+    tail = ""
+    first_at = None
+
+    try:
+        while True:
+            timeout = None
+            if buffer:
+                timeout = max(0.0, max_delay - (time.monotonic() - first_at))
+
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                item = None  # delay elapsed with data pending
+
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                # Deliver what was already generated before surfacing the error
+                if buffer:
+                    yield "".join(buffer)
+                    buffer.clear()
+                raise item
+
+            if item:
+                if not buffer:
+                    first_at = time.monotonic()
+                buffer.append(item)
+                buffered_bytes += len(item.encode("utf-8"))
+                tail = (tail + item)[-16:]
+                if buffered_bytes < target and not _at_boundary(tail, item):
+                    continue
+
+            if not buffer:
+                continue
+
+            # Flush; the time spent suspended in `yield` is the client's send time
+            sent_at = time.monotonic()
+            yield "".join(buffer)
+            send_time = time.monotonic() - sent_at
+            buffer.clear()
+            buffered_bytes = 0
+
+            if policy.mode == "adaptive":
+                if send_time > max_delay:
+                    target = min(policy.max_bytes, target * 2)
+                elif send_time < max_delay / 4:
+                    target = max(policy.min_bytes, target // 2)
+
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        pump_task.cancel()
@@ -1,9 +1,18 @@
 import os
 import re
+import time
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Tuple
 from google.cloud import translate_v2 as translate
 from google.oauth2 import service_account
 from dotenv import load_dotenv
 from langdetect import detect, LangDetectException
+from app.utils.usage import record_usage
+from app.utils.config import config
+from app.utils.deadline import DeadlineExceeded, check_deadline, stage_timeout
 
 # Load environment variables
 load_dotenv()
@@ -20,6 +29,38 @@ if not GOOGLE_CREDENTIALS_PATH or not os.path.exists(GOOGLE_CREDENTIALS_PATH):
 credentials = service_account.Credentials.from_service_account_file(GOOGLE_CREDENTIALS_PATH)
 translate_client = translate.Client(credentials=credentials)
 
+# The client has no per-call timeout, so calls run on a pool and the caller
+# waits at most for the remaining request budget
+translate_executor = ThreadPoolExecutor(max_workers=config.TRANSLATE_WORKERS, thread_name_prefix="translate")
+
+# Google Translate v2 accepts at most 128 segments per request
+MAX_SEGMENTS_PER_REQUEST = 128
+
+class TranslationCache:
+    """Thread-safe LRU of (target language, source text) -> translation"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, target_lang: str, text: str):
+        with self._lock:
+            key = (target_lang, text)
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+            return None
+
+    def put(self, target_lang: str, text: str, translated: str) -> None:
+        with self._lock:
+            self._items[(target_lang, text)] = translated
+            self._items.move_to_end((target_lang, text))
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+translation_cache = TranslationCache(config.TRANSLATION_CACHE_SIZE)
+
 def remove_emojis(text: str) -> str:
     """
     Removes common emojis from the text.
@@ -47,38 +88,199 @@ def detect_language(text: str) -> str:
     except LangDetectException:
         return "en"  # Fallback to English if detection fails or is ambiguous
 
+# Unicode ranges of languages with their own script; checking these is far
+# cheaper and more reliable on short text than statistical detection
+SCRIPT_RANGES = {
+    "hi": [(0x0900, 0x097F)], "mr": [(0x0900, 0x097F)], "ne": [(0x0900, 0x097F)],
+    "bn": [(0x0980, 0x09FF)], "pa": [(0x0A00, 0x0A7F)], "gu": [(0x0A80, 0x0AFF)],
+    "ta": [(0x0B80, 0x0BFF)], "te": [(0x0C00, 0x0C7F)], "kn": [(0x0C80, 0x0CFF)],
+    "ml": [(0x0D00, 0x0D7F)], "ar": [(0x0600, 0x06FF)], "ur": [(0x0600, 0x06FF)],
+    "ru": [(0x0400, 0x04FF)], "zh-cn": [(0x4E00, 0x9FFF)],
+    "ja": [(0x3040, 0x30FF), (0x4E00, 0x9FFF)], "ko": [(0xAC00, 0xD7AF)]
+}
+CODE_BLOCK_PATTERN = re.compile(r"```.*?(```|$)|`[^`]*`", re.DOTALL)
+
+def matches_language(text: str, language: str, sample_chars: int = 300, min_ratio: float = 0.5) -> bool:
+    """
+    Cheap check that generated text is in the expected language.
+    Code is ignored; script-based languages use a letter-ratio test on a
+    sample, the rest fall back to langdetect on the same sample.
+    """
+    sample = CODE_BLOCK_PATTERN.sub(" ", text)[:sample_chars]
+    letters = [ch for ch in sample if ch.isalpha()]
+    if not letters:
+        return True  # nothing to judge (code, numbers, emojis)
+
+    ranges = SCRIPT_RANGES.get(language)
+    if ranges:
+        in_script = sum(1 for ch in letters if any(lo <= ord(ch) <= hi for lo, hi in ranges))
+        return in_script / len(letters) >= min_ratio
+
+    return detect_language(sample) == language
+
+FENCE_PATTERN = re.compile(r"```.*?(?:```|$)", re.DOTALL)
+PARAGRAPH_SPLIT_PATTERN = re.compile(r"(\n\s*\n)")
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?।。！？])(\s+)")
+
+def _hard_split(text: str, limit: int) -> List[str]:
+    """Splits an over-long sentence at the last whitespace before the limit"""
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind(" ", 0, limit)
+        cut = cut if cut > 0 else limit
+        chunks.append(text[:cut])
+        text = text[cut:]
+    chunks.append(text)
+    return chunks
+
+def _split_prose(prose: str, pieces: List[Tuple[str, bool]]) -> None:
+    limit = config.TRANSLATE_SEGMENT_CHARS
+    for paragraph in PARAGRAPH_SPLIT_PATTERN.split(prose):
+        if not paragraph:
+            continue
+        if not paragraph.strip():
+            pieces.append((paragraph, False))
+        elif len(paragraph) <= limit:
+            pieces.append((paragraph, True))
+        else:
+            for sentence in SENTENCE_SPLIT_PATTERN.split(paragraph):
+                if not sentence.strip():
+                    pieces.append((sentence, False))
+                else:
+                    pieces.extend((chunk, True) for chunk in _hard_split(sentence, limit))
+
+def split_for_translation(text: str) -> List[Tuple[str, bool]]:
+    """
+    Splits text into (piece, translatable) pairs on fenced-code, paragraph and
+    sentence boundaries. Joining the pieces gives back the original text;
+    fenced code and whitespace separators are marked untranslatable.
+    """
+    pieces = []
+    position = 0
+    for fence in FENCE_PATTERN.finditer(text):
+        _split_prose(text[position:fence.start()], pieces)
+        pieces.append((fence.group(0), False))
+        position = fence.end()
+    _split_prose(text[position:], pieces)
+    return pieces
+
+def _translate_batch(segments: List[str], target_lang: str) -> List[str]:
+    """One Translate API request for a batch of segments (runs on the pool)"""
+    started = time.monotonic()
+    results = translate_client.translate(segments, target_language=target_lang, format_='text')
+    record_usage(
+        "google_translate",
+        translated_chars=sum(len(segment) for segment in segments),
+        latency_ms=(time.monotonic() - started) * 1000
+    )
+
+    translated = []
+    for result in results:
+        value = result.get("translatedText", "")
+        translated.append(value.decode("utf-8") if isinstance(value, bytes) else value)
+    return translated
+
+def _make_batches(segments: List[str]) -> List[List[str]]:
+    """Groups segments into requests bounded by character count and segment count"""
+    batches, current, current_chars = [], [], 0
+    for segment in segments:
+        if current and (current_chars + len(segment) > config.TRANSLATE_BATCH_CHARS
+                        or len(current) >= MAX_SEGMENTS_PER_REQUEST):
+            batches.append(current)
+            current, current_chars = [], 0
+        current.append(segment)
+        current_chars += len(segment)
+    if current:
+        batches.append(current)
+    return batches
+
+def translate_segments(segments: List[str], target_lang: str) -> Dict[str, str]:
+    """
+    Translates unique segments through the shared cache, sending the misses
+    as concurrent size-bounded batches. Segments of a failed batch map to
+    themselves; running out of request budget raises DeadlineExceeded.
+    """
+    translations, misses = {}, []
+    for segment in dict.fromkeys(segments):
+        cached = translation_cache.get(target_lang, segment)
+        if cached is None:
+            misses.append(segment)
+        else:
+            translations[segment] = cached
+
+    if not misses:
+        return translations
+
+    # copy_context so usage is attributed to the calling request
+    futures = {
+        translate_executor.submit(contextvars.copy_context().run, _translate_batch, batch, target_lang): batch
+        for batch in _make_batches(misses)
+    }
+    done, not_done = wait(futures, timeout=stage_timeout("translation"))
+    if not_done:
+        for future in not_done:
+            future.cancel()
+        raise DeadlineExceeded("translation")
+
+    for future in done:
+        batch = futures[future]
+        try:
+            for source, translated in zip(batch, future.result()):
+                translations[source] = translated
+                translation_cache.put(target_lang, source, translated)
+        except Exception as e:
+            print(f"[Translation Error]: {e}")
+            translations.update((source, source) for source in batch)
+
+    return translations
+
 def translate_text(text: str, target_lang: str = "en") -> str:
     """
     Translates input text into the target language using Google Translate API.
     Only performs translation if necessary (if input is not already in target language).
     Skips translation if the input text is already in the target language.
+    Long text is split on code/paragraph/sentence boundaries and translated
+    concurrently; fenced code is left untouched.
     """
-    if not text:
-        return ""
+    # Nothing to translate; whitespace-only text is returned as-is
+    if not text.strip():
+        return text
 
     try:
-        detected_language = detect_language(text)
+        check_deadline("language detection")
+        detected_language = detect_language(CODE_BLOCK_PATTERN.sub(" ", text))
         
         # Skip translation if already in the target language
         if detected_language == target_lang or (detected_language == "en" and target_lang == "en"):
             return text
 
         # Proceed with translation if not in the target language
-        result = translate_client.translate(
-            text,
-            target_language=target_lang,
-            format_='text'
-        )
+        if len(text) <= config.TRANSLATE_SEGMENT_CHARS and "```" not in text:
+            pieces = [(text, True)]
+        else:
+            pieces = split_for_translation(text)
+
+        cores = [piece.strip() for piece, translatable in pieces if translatable]
+        translations = translate_segments([core for core in cores if core], target_lang)
 
-        translated = result.get("translatedText", "")
-        if isinstance(translated, bytes):
-            translated = translated.decode("utf-8")
+        output = []
+        for piece, translatable in pieces:
+            core = piece.strip()
+            if not translatable or not core:
+                output.append(piece)
+                continue
+            # Keep the whitespace around each piece so the layout survives
+            leading = piece[:len(piece) - len(piece.lstrip())]
+            trailing = piece[len(piece.rstrip()):]
+            output.append(leading + translations.get(core, core) + trailing)
 
         # Uncomment if you want to clean emojis from translated text
         # translated = remove_emojis(translated)
 
-        return translated
+        return "".join(output)
 
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"[Translation Error]: {e}")
         return text  # Return original text if translation fails
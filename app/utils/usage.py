@@ -0,0 +1,90 @@
+# app/utils/usage.py
+
+import asyncio
+import threading
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import List, Optional
+from app.repositories.base import PartialUsageWrite
+from app.utils.config import config
+
+# (user_id, session_id) of the request being served, set by the chat pipeline
+usage_context: ContextVar[tuple] = ContextVar("usage_context", default=(None, None))
+
+COUNTER_FIELDS = ("calls", "prompt_tokens", "completion_tokens", "total_tokens", "translated_chars", "latency_ms")
+
+
+class UsageTracker:
+    """
+    Aggregates provider usage in memory per (user, session, provider) and
+    periodically flushes the totals to storage as increments, so individual
+    requests never pay for a usage write.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+
+    def record(self, provider: str, prompt_tokens: int = 0, completion_tokens: int = 0,
+               translated_chars: int = 0, latency_ms: float = 0.0,
+               user_id: Optional[str] = None, session_id: Optional[str] = None) -> None:
+        ctx_user, ctx_session = usage_context.get()
+        key = (user_id or ctx_user or "anonymous", session_id or ctx_session or "", provider)
+        with self._lock:
+            counters = self._pending[key]
+            counters["calls"] += 1
+            counters["prompt_tokens"] += prompt_tokens or 0
+            counters["completion_tokens"] += completion_tokens or 0
+            counters["total_tokens"] += (prompt_tokens or 0) + (completion_tokens or 0)
+            counters["translated_chars"] += translated_chars or 0
+            counters["latency_ms"] += round(latency_ms or 0.0, 2)
+
+    def flush(self) -> int:
+        """Writes pending totals; rows that failed are merged back for the next flush"""
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+        if not pending:
+            return 0
+
+        rows = [
+            {"user_id": user_id, "session_id": session_id, "provider": provider, **counters}
+            for (user_id, session_id, provider), counters in pending.items()
+        ]
+        try:
+            from app.repositories.factory import get_repository
+            get_repository().apply_usage(rows)
+        except PartialUsageWrite as e:
+            # The other rows are already stored; re-queueing them would count them twice
+            print(f"[ERROR - usage flush]: {e}")
+            self._requeue(e.failed_rows)
+            return len(rows) - len(e.failed_rows)
+        except Exception as e:
+            print(f"[ERROR - usage flush]: {e}")
+            self._requeue(rows)
+            return 0
+
+        print(f"[USAGE] Flushed {len(rows)} usage rows")
+        return len(rows)
+
+    def _requeue(self, rows: List[dict]) -> None:
+        """Merges rows that failed to flush back into the pending totals"""
+        with self._lock:
+            for row in rows:
+                counters = self._pending[(row["user_id"], row["session_id"], row["provider"])]
+                for field in COUNTER_FIELDS:
+                    counters[field] += row[field]
+
+
+usage_tracker = UsageTracker()
+
+
+def record_usage(provider: str, **counters) -> None:
+    usage_tracker.record(provider, **counters)
+
+
+async def usage_flush_loop(interval: float = None) -> None:
+    """Background task flushing usage totals every USAGE_FLUSH_INTERVAL seconds"""
+    interval = interval or config.USAGE_FLUSH_INTERVAL
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(usage_tracker.flush)
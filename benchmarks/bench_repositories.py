@@ -0,0 +1,110 @@
+# benchmarks/bench_repositories.py
+#
+# Throughput of the same workload against every ChatRepository backend:
+# saving turns, reading recent history, listing sessions, exporting and
+# flushing usage. SQLite runs on a temporary file; Mongo uses MONGO_BENCH_URI
+# when set, otherwise mongomock (in-process, so only useful as a smoke run).
+#
+# Usage: python -m benchmarks.bench_repositories [--turns 5000] [--sessions 200]
+
+import argparse
+import os
+import tempfile
+import time
+import uuid
+import warnings
+from datetime import datetime, timedelta
+
+warnings.simplefilter("ignore")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+from app.repositories.mongo import MongoChatRepository
+from app.repositories.sqlite import SQLiteChatRepository
+from app.services.history_schema import build_history_doc
+
+USER_ID = "bench-user"
+
+
+def sqlite_repository():
+    return "sqlite", SQLiteChatRepository(os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+
+def mongo_repository():
+    db_name = f"chatbot_bench_{uuid.uuid4().hex}"
+    uri = os.getenv("MONGO_BENCH_URI")
+    if uri:
+        return "mongo", MongoChatRepository(uri, db_name)
+
+    import mongomock
+    from tests.conftest import _patch_mongomock_bulk
+
+    _patch_mongomock_bulk(mongomock)
+    repository = MongoChatRepository("mongodb://mock", db_name)
+    repository._client = mongomock.MongoClient()
+    repository._ensure_indexes(repository._client[db_name])
+    return "mongo (mongomock)", repository
+
+
+def timed(label: str, count: int, func) -> None:
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<22} {count:>7} ops  {elapsed * 1000:9.1f} ms  {count / elapsed:11.0f} ops/s")
+
+
+def run(name: str, repository, turns: int, sessions: int) -> None:
+    print(name)
+    start = datetime(2026, 1, 1)
+
+    def save_turns():
+        for i in range(turns):
+            session_id = f"s{i % sessions}"
+            at = start + timedelta(seconds=i)
+            repository.save_turn(
+                build_history_doc(session_id, USER_ID, f"Question {i}", f"Question {i}", f"Answer {i}", "en", at),
+                session_id=session_id, user_id=USER_ID, title=f"Question {i}", created_at=at, preview=f"Answer {i}"
+            )
+
+    def read_history():
+        for i in range(turns):
+            repository.recent_history(f"s{i % sessions}", limit=10)
+
+    def list_sessions():
+        for _ in range(100):
+            repository.list_sessions(USER_ID)
+
+    def export():
+        for session in repository.iter_sessions(USER_ID):
+            for _ in repository.iter_messages(session["id"]):
+                pass
+
+    def apply_usage():
+        rows = [
+            {"user_id": USER_ID, "session_id": f"s{i}", "provider": "openrouter", "calls": 1,
+             "prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15,
+             "translated_chars": 0, "latency_ms": 1.0}
+            for i in range(sessions)
+        ]
+        for _ in range(10):
+            repository.apply_usage(rows)
+
+    timed("save_turn", turns, save_turns)
+    timed("recent_history", turns, read_history)
+    timed("list_sessions", 100, list_sessions)
+    timed("export (rows)", turns + sessions, export)
+    timed("apply_usage (rows)", sessions * 10, apply_usage)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ChatRepository backends")
+    parser.add_argument("--turns", type=int, default=5000)
+    parser.add_argument("--sessions", type=int, default=200)
+    args = parser.parse_args()
+
+    for factory in (sqlite_repository, mongo_repository):
+        name, repository = factory()
+        run(name, repository, args.turns, args.sessions)
+
+
+if __name__ == "__main__":
+    main()
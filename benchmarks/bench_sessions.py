@@ -0,0 +1,122 @@
+# benchmarks/bench_sessions.py
+#
+# Times GET /sessions for a user with N sessions against an embedded SQLite
+# store: the shipped route (orjson, no response_model validation, projected
+# reads) versus the baseline shape (response_model=List[ChatSessionSummary]).
+# Also times building chat_history documents via Pydantic .dict() vs directly.
+#
+# Usage: python -m benchmarks.bench_sessions [--sessions 5000] [--repeat 20]
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import warnings
+from datetime import datetime, timedelta
+from typing import List
+
+warnings.simplefilter("ignore")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", "credentials/ai-chatbot-456710-14a3e3bded79.json")
+os.environ["STORAGE_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(), "bench_sessions.db")
+
+from fastapi import FastAPI, Query
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from app.main import app
+from app.repositories.factory import get_repository
+from app.routes.chats import ChatSessionSummary
+from app.services.chat_processing import get_user_chat_sessions
+from app.services.history_schema import build_history_doc
+
+USER_ID = "bench-user"
+
+
+class BaselineChatHistory(BaseModel):
+    """chat_history model as it was before direct document construction"""
+    session_id: str
+    user_id: str
+    user_prompt: str
+    translated_prompt: str
+    llm_response: str
+    final_response: str
+    language: str
+    timestamp: datetime
+
+
+def seed(sessions: int) -> None:
+    repository = get_repository()
+    start = datetime(2026, 1, 1)
+    for i in range(sessions):
+        at = start + timedelta(minutes=i)
+        repository.save_turn(
+            build_history_doc(f"s{i}", USER_ID, f"Question {i}", f"Question {i}", f"Answer {i}", "en", at),
+            session_id=f"s{i}", user_id=USER_ID, title=f"Question {i}", created_at=at, preview=f"Answer {i}"
+        )
+
+
+def baseline_app() -> FastAPI:
+    baseline = FastAPI()
+
+    @baseline.get("/sessions", response_model=List[ChatSessionSummary])
+    async def list_sessions(user_id: str = Query(...)):
+        return get_user_chat_sessions(user_id)
+
+    return baseline
+
+
+def time_requests(client: TestClient, path: str, repeat: int) -> List[float]:
+    # identity encoding so both sides are compared without gzip cost
+    headers = {"Accept-Encoding": "identity"}
+    client.get(path, params={"user_id": USER_ID}, headers=headers)  # warm-up
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path, params={"user_id": USER_ID}, headers=headers)
+        samples.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200
+    return samples
+
+
+def time_documents(count: int) -> tuple:
+    now = datetime.utcnow()
+    started = time.perf_counter()
+    for i in range(count):
+        BaselineChatHistory(
+            session_id="s", user_id="u", user_prompt=f"q{i}", translated_prompt=f"q{i}",
+            llm_response=f"a{i}", final_response=f"<p>a{i}</p>", language="en", timestamp=now
+        ).dict()
+    pydantic_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    for i in range(count):
+        build_history_doc("s", "u", f"q{i}", f"q{i}", f"a{i}", "en", now)
+    direct_ms = (time.perf_counter() - started) * 1000
+    return pydantic_ms, direct_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /sessions serialization")
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    seed(args.sessions)
+    shipped = time_requests(TestClient(app), "/api/v1/sessions", args.repeat)
+    baseline = time_requests(TestClient(baseline_app()), "/sessions", args.repeat)
+
+    print(f"/sessions with {args.sessions} sessions ({args.repeat} requests each)")
+    for name, samples in (("baseline (response_model)", baseline), ("orjson, unvalidated", shipped)):
+        print(f"  {name:<26} median {statistics.median(samples):8.2f} ms   min {min(samples):8.2f} ms")
+
+    pydantic_ms, direct_ms = time_documents(args.sessions)
+    print(f"chat_history documents x{args.sessions}")
+    print(f"  {'Pydantic model + .dict()':<26} {pydantic_ms:8.2f} ms")
+    print(f"  {'build_history_doc':<26} {direct_ms:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# benchmarks/bench_streaming.py
+#
+# Drives coalesce_chunks with a fake LLM delta source (fixed token size and
+# inter-token gap) and a fake client send, for each flush policy. Reports the
+# number of sends per stream, CPU time per stream and time-to-first-byte.
+#
+# Usage: python -m benchmarks.bench_streaming [--streams 50] [--tokens 400]
+#            [--gap-ms 2] [--send-ms 0]
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import warnings
+
+warnings.simplefilter("ignore")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", "credentials/ai-chatbot-456710-14a3e3bded79.json")
+
+from app.utils.streaming import FlushPolicy, coalesce_chunks
+
+# A code fence every 100 tokens and a newline every 25, like a typical answer
+TOKENS = ["word " if i % 25 else "line\n" for i in range(100)]
+TOKENS[50] = "```\n"
+
+
+async def fake_deltas(tokens: int, gap: float):
+    for i in range(tokens):
+        if gap:
+            await asyncio.sleep(gap)
+        yield TOKENS[i % len(TOKENS)]
+
+
+async def one_stream(policy: FlushPolicy, args) -> tuple:
+    started = time.perf_counter()
+    first_byte = None
+    sends = 0
+    async for _ in coalesce_chunks(fake_deltas(args.tokens, args.gap_ms / 1000), policy):
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        sends += 1
+        # one ASGI send; a slow client makes it take longer
+        await asyncio.sleep(args.send_ms / 1000)
+    return sends, first_byte * 1000
+
+
+async def run_policy(policy: FlushPolicy, args) -> tuple:
+    cpu_started = time.process_time()
+    results = await asyncio.gather(*(one_stream(policy, args) for _ in range(args.streams)))
+    cpu_ms = (time.process_time() - cpu_started) * 1000
+    sends = [sends for sends, _ in results]
+    ttfb = [ttfb for _, ttfb in results]
+    return statistics.mean(sends), cpu_ms / args.streams, statistics.median(ttfb)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming flush policies")
+    parser.add_argument("--streams", type=int, default=50, help="concurrent streams per policy")
+    parser.add_argument("--tokens", type=int, default=400, help="deltas per stream")
+    parser.add_argument("--gap-ms", type=float, default=2, help="delay between upstream deltas")
+    parser.add_argument("--send-ms", type=float, default=0, help="simulated time per client send")
+    args = parser.parse_args()
+
+    print(f"{args.streams} streams x {args.tokens} deltas, {args.gap_ms} ms between deltas, "
+          f"{args.send_ms} ms per send")
+    print(f"  {'policy':<12} {'sends/stream':>13} {'CPU ms/stream':>14} {'TTFB median ms':>15}")
+    for mode in ("passthrough", "coalesce", "adaptive"):
+        policy = FlushPolicy.from_config()
+        policy.mode = mode
+        sends, cpu_ms, ttfb = asyncio.run(run_policy(policy, args))
+        print(f"  {mode:<12} {sends:13.1f} {cpu_ms:14.2f} {ttfb:15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_translation.py
+#
+# Times translate_text on long inputs against a stubbed Translate client that
+# sleeps a fixed time per request (plus an optional per-character cost).
+# "serial" sends the same size-bounded batches one after another on a
+# single-worker pool; "chunked+concurrent" uses the shipped translate pool.
+# The translation cache is reset before every run.
+#
+# Usage: python -m benchmarks.bench_translation [--latency-ms 150] [--ms-per-kchar 0]
+#            [--sizes 1000 5000 20000 50000]
+
+import argparse
+import os
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+warnings.simplefilter("ignore")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", "credentials/ai-chatbot-456710-14a3e3bded79.json")
+
+from app.utils import translate
+from app.utils.config import config
+
+# Numbered so every paragraph is a distinct segment (duplicates are sent once)
+PARAGRAPH = (
+    "Paragraph {}. The service keeps a short history for every session. Each answer "
+    "is rendered to HTML once and cached. Long answers are split before translation.\n\n"
+)
+CODE = "```python\nfor item in items:\n    print(item)\n```\n\n"
+
+
+class FakeTranslateClient:
+    """Stands in for google.cloud.translate_v2.Client with a fixed latency"""
+
+    def __init__(self, latency: float, per_char: float):
+        self.latency = latency
+        self.per_char = per_char
+        self.requests = 0
+
+    def translate(self, values, target_language, format_):
+        self.requests += 1
+        time.sleep(self.latency + self.per_char * sum(len(value) for value in values))
+        return [{"translatedText": value} for value in values]
+
+
+def make_text(chars: int) -> str:
+    blocks, size, i = [], 0, 0
+    while size < chars:
+        block = CODE if i % 5 == 4 else PARAGRAPH.format(i)
+        blocks.append(block)
+        size += len(block)
+        i += 1
+    return "".join(blocks)[:chars]
+
+
+def run(text: str, client: FakeTranslateClient, executor: ThreadPoolExecutor) -> float:
+    translate.translation_cache = translate.TranslationCache(config.TRANSLATION_CACHE_SIZE)
+    translate.translate_executor = executor
+    started = time.perf_counter()
+    translate.translate_text(text, "hi")
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark long-text translation")
+    parser.add_argument("--latency-ms", type=float, default=150, help="fixed latency per request")
+    parser.add_argument("--ms-per-kchar", type=float, default=0, help="extra latency per 1000 characters")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000, 50000])
+    args = parser.parse_args()
+
+    client = FakeTranslateClient(args.latency_ms / 1000, args.ms_per_kchar / 1_000_000)
+    translate.translate_client = client
+    concurrent = translate.translate_executor
+    serial = ThreadPoolExecutor(max_workers=1)
+    translate.detect_language(PARAGRAPH)  # load langdetect profiles outside the timings
+
+    print(f"{args.latency_ms} ms per request + {args.ms_per_kchar} ms per 1000 chars, "
+          f"{config.TRANSLATE_WORKERS} workers, batches of {config.TRANSLATE_BATCH_CHARS} chars")
+    print(f"  {'chars':>7} {'requests':>9} {'serial ms':>10} {'concurrent ms':>14} {'speedup':>8}")
+    for size in args.sizes:
+        text = make_text(size)
+        client.requests = 0
+        serial_ms = run(text, client, serial)
+        requests = client.requests
+        concurrent_ms = run(text, client, concurrent)
+        print(f"  {size:>7} {requests:>9} {serial_ms:10.1f} {concurrent_ms:14.1f} {serial_ms / concurrent_ms:7.1f}x")
+
+    serial.shutdown()
+
+
+if __name__ == "__main__":
+    main()
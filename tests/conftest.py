@@ -0,0 +1,72 @@
+import inspect
+import os
+import sys
+import uuid
+
+import pytest
+
+# app.utils.config refuses to load without these
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", "credentials/ai-chatbot-456710-14a3e3bded79.json")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_sqlite_repository(tmp_path):
+    from app.repositories.sqlite import SQLiteChatRepository
+    return SQLiteChatRepository(str(tmp_path / "chat.db"), batch_size=3)
+
+
+def _patch_mongomock_bulk(mongomock):
+    """pymongo >= 4.9 passes sort= to bulk builders, which mongomock 4.x lacks"""
+    builder = mongomock.collection.BulkOperationBuilder
+    for name in ("add_update", "add_replace"):
+        original = getattr(builder, name)
+        if "sort" in inspect.signature(original).parameters:
+            continue
+
+        def without_sort(self, *args, sort=None, _original=original, **kwargs):
+            return _original(self, *args, **kwargs)
+
+        setattr(builder, name, without_sort)
+
+
+def make_mongo_repository():
+    """Real server when MONGO_TEST_URI is set, otherwise mongomock"""
+    from app.repositories import mongo
+
+    db_name = f"chatbot_test_{uuid.uuid4().hex}"
+    uri = os.getenv("MONGO_TEST_URI")
+    if uri:
+        repository = mongo.MongoChatRepository(uri, db_name, batch_size=3)
+        try:
+            repository.db.client.admin.command("ping")
+        except Exception:
+            pytest.skip(f"MongoDB not reachable at {uri}")
+        return repository
+
+    mongomock = pytest.importorskip("mongomock")
+    _patch_mongomock_bulk(mongomock)
+    repository = mongo.MongoChatRepository("mongodb://mock", db_name, batch_size=3)
+    repository._client = mongomock.MongoClient()
+    repository._ensure_indexes(repository._client[db_name])
+    return repository
+
+
+@pytest.fixture(params=["sqlite", "mongo"])
+def repository(request, tmp_path):
+    if request.param == "sqlite":
+        repo = make_sqlite_repository(tmp_path)
+    else:
+        repo = make_mongo_repository()
+    yield repo
+    if request.param == "mongo":
+        repo._client.drop_database(repo.db_name)
+
+
+@pytest.fixture(autouse=True)
+def reset_deadline():
+    """Deadlines live in a context variable; keep one test's deadline out of the next"""
+    from app.utils.deadline import current_deadline
+    token = current_deadline.set(None)
+    yield
+    current_deadline.reset(token)
@@ -0,0 +1,117 @@
+import asyncio
+
+from app.services import chat_processing
+from tests.conftest import make_sqlite_repository
+
+
+def fake_pipeline(monkeypatch, llm_output, detected="hi"):
+    calls = {"translate": [], "llm": []}
+
+    def translate_text(text, target_lang="en"):
+        calls["translate"].append((text, target_lang))
+        return f"<{target_lang}>{text}"
+
+    def query_llm(prompt, **kwargs):
+        calls["llm"].append((prompt, kwargs["language"]))
+        return llm_output
+
+    monkeypatch.setattr(chat_processing, "detect_language", lambda text: detected)
+    monkeypatch.setattr(chat_processing, "translate_text", translate_text)
+    monkeypatch.setattr(chat_processing, "query_llm", query_llm)
+    return calls
+
+
+def test_english_target_translates_foreign_prompt(monkeypatch):
+    calls = fake_pipeline(monkeypatch, "Hello!")
+
+    result = chat_processing.process_chat({"prompt": "नमस्ते", "language": "en", "session_id": "s1"})
+
+    assert calls["llm"] == [("<en>नमस्ते", "en")]
+    assert result["translated_prompt"] == "<en>नमस्ते"
+
+
+def test_english_answer_is_not_translated(monkeypatch):
+    # langdetect misreads short English ("Sure!" -> fr); the answer must not be sent to Translate
+    calls = fake_pipeline(monkeypatch, "Sure!", detected="fr")
+
+    result = chat_processing.process_chat({"prompt": "D'accord?", "language": "en", "session_id": "s1"})
+
+    assert calls["translate"] == [("D'accord?", "en")]
+    assert result["llm_response"] == "Sure!"
+
+
+def test_native_target_sends_prompt_untranslated(monkeypatch):
+    monkeypatch.setitem(chat_processing.config.GENERATION_MODES, "hi", "native")
+    calls = fake_pipeline(monkeypatch, "नमस्ते, मैं निम्बस हूँ")
+
+    result = chat_processing.process_chat({"prompt": "नमस्ते", "language": "hi", "session_id": "s1"})
+
+    assert calls["llm"] == [("नमस्ते", "hi")]
+    assert calls["translate"] == []
+    assert result["llm_response"] == "नमस्ते, मैं निम्बस हूँ"
+
+
+def test_native_target_falls_back_to_translation(monkeypatch):
+    monkeypatch.setitem(chat_processing.config.GENERATION_MODES, "hi", "native")
+    calls = fake_pipeline(monkeypatch, "Hello, I am Nimbus")
+
+    result = chat_processing.process_chat({"prompt": "नमस्ते", "language": "hi", "session_id": "s1"})
+
+    assert calls["translate"] == [("Hello, I am Nimbus", "hi")]
+    assert result["llm_response"] == "<hi>Hello, I am Nimbus"
+
+
+def stream(monkeypatch, deltas, language="hi"):
+    calls = []
+
+    def translate_text(text, target_lang="en"):
+        calls.append(text)
+        return text.upper()
+
+    async def stream_llm_response(prompt, **kwargs):
+        for delta in deltas:
+            yield delta
+
+    monkeypatch.setitem(chat_processing.config.GENERATION_MODES, language, "translate")
+    monkeypatch.setattr(chat_processing, "detect_language", lambda text: "en")
+    monkeypatch.setattr(chat_processing, "translate_text", translate_text)
+    monkeypatch.setattr(chat_processing, "stream_llm_response", stream_llm_response)
+
+    async def run():
+        request = {"prompt": "hello", "language": language, "session_id": "s1"}
+        return [chunk async for chunk in chat_processing.stream_chat_response(request)]
+    return "".join(asyncio.run(run())), calls
+
+
+def test_stream_translates_whole_sentences(monkeypatch):
+    deltas = ["Version", " 3", ".5", " is", " out.", " It", " is", " fast!", "\n", "Try", " it"]
+
+    text, calls = stream(monkeypatch, deltas)
+
+    assert calls == ["Version 3.5 is out.", " It is fast!", "\n", "Try it"]
+    assert text == "VERSION 3.5 IS OUT. IT IS FAST!\nTRY IT"
+
+
+def test_stream_keeps_code_blocks_in_one_translation(monkeypatch):
+    deltas = ["Run:\n", "```", "\n", "pip", " install", "\n", "```", "\n", "Done."]
+
+    text, calls = stream(monkeypatch, deltas)
+
+    assert calls == ["Run:\n", "```\npip install\n```\n", "Done."]
+
+
+def test_stop_row_keeps_marker_out_of_response_and_preview(monkeypatch, tmp_path):
+    repository = make_sqlite_repository(tmp_path)
+    monkeypatch.setattr(chat_processing, "get_repository", lambda: repository)
+    chat_processing.save_chat_history("s1", "u1", "Tell me a story", "Tell me a story", "Once upon a time", "en")
+    event = asyncio.Event()
+    monkeypatch.setitem(chat_processing.active_streams, "s1", {"stream": event})
+
+    chat_processing.stop_chat_stream("s1", user_id="u1")
+
+    assert event.is_set()
+    latest = chat_processing.get_chat_history_by_session("s1")[0]
+    assert latest == {"user": "[SYSTEM]", "ai": "Chat generation was stopped by user"}
+    [session] = chat_processing.get_user_chat_sessions("u1")
+    assert session["last_preview"] == "Once upon a time"
+    assert session["message_count"] == 2
@@ -0,0 +1,81 @@
+import sys
+import time
+import types
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routes import chats
+from app.utils import llm
+from app.utils.config import config
+from app.utils.deadline import DeadlineExceeded, start_deadline
+
+
+@pytest.mark.parametrize("header", [None, "", "abc", "nan", "NaN", "inf", "-inf"])
+def test_invalid_header_uses_default_timeout(header):
+    deadline = start_deadline(header)
+
+    assert deadline.remaining() == pytest.approx(config.REQUEST_TIMEOUT_SECONDS, abs=0.5)
+
+
+def test_header_is_clamped():
+    assert start_deadline("0").remaining() <= 0.1
+    assert start_deadline("1e9").remaining() == pytest.approx(config.MAX_REQUEST_TIMEOUT_SECONDS, abs=0.5)
+
+
+def test_stream_limits_apply_when_given():
+    stream = dict(default=config.STREAM_TIMEOUT_SECONDS, maximum=config.MAX_STREAM_TIMEOUT_SECONDS)
+
+    assert start_deadline(None, **stream).remaining() == pytest.approx(config.STREAM_TIMEOUT_SECONDS, abs=0.5)
+    assert start_deadline("1e9", **stream).remaining() == pytest.approx(config.MAX_STREAM_TIMEOUT_SECONDS, abs=0.5)
+
+
+def test_groq_fallback_is_skipped_without_budget(monkeypatch):
+    groq_clients = []
+    monkeypatch.setitem(sys.modules, "groq", types.SimpleNamespace(Groq=lambda: groq_clients.append(1)))
+
+    def failing_post(*args, **kwargs):
+        raise ConnectionError("openrouter down")
+    monkeypatch.setattr(llm.requests, "post", failing_post)
+    start_deadline(str(config.MIN_FALLBACK_BUDGET_SECONDS / 2))
+
+    with pytest.raises(DeadlineExceeded):
+        llm.query_llm("hello", model="openrouter-mistral", language="en", format="raw")
+    assert groq_clients == []
+
+
+def chat_request(client, timeout="5"):
+    body = {"prompt": "hello", "language": "en", "session_id": "s1", "user_id": "u1"}
+    return client.post(f"{config.API_PREFIX}/chat", json=body, headers={"X-Request-Timeout": timeout})
+
+
+def test_chat_answers_504_when_a_stage_runs_out_of_budget(monkeypatch):
+    def process_chat(request):
+        raise DeadlineExceeded("translation")
+    monkeypatch.setattr(chats, "process_chat", process_chat)
+
+    response = chat_request(TestClient(app))
+
+    assert response.status_code == 504
+
+
+def test_chat_answers_504_when_the_deadline_passes(monkeypatch):
+    monkeypatch.setattr(chats, "process_chat", lambda request: time.sleep(0.5))
+
+    response = chat_request(TestClient(app), timeout="0.1")
+
+    assert response.status_code == 504
+
+
+def test_stream_cut_off_by_deadline_ends_with_marker(monkeypatch):
+    async def stream_chat_response(request):
+        yield "partial answer"
+        raise DeadlineExceeded("openrouter stream")
+    monkeypatch.setattr(chats, "stream_chat_response", stream_chat_response)
+    body = {"prompt": "hello", "language": "en", "session_id": "s1", "user_id": "u1"}
+
+    response = TestClient(app).post(f"{config.API_PREFIX}/chat/stream", json=body)
+
+    assert response.status_code == 200
+    assert response.text == "partial answer" + chats.STREAM_TRUNCATED_MARKER
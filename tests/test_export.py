@@ -0,0 +1,93 @@
+import gzip
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import chat_processing
+from app.utils.config import config
+from tests.conftest import make_sqlite_repository
+from tests.test_repositories import save
+
+EXPORT = f"{config.API_PREFIX}/export"
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    repository = make_sqlite_repository(tmp_path)
+    monkeypatch.setattr(chat_processing, "get_repository", lambda: repository)
+    for i in range(4):
+        save(repository, "s1", i)
+    for i in range(4, 6):
+        save(repository, "s2", i)
+    return repository
+
+
+def export(client, **params):
+    response = client.get(EXPORT, params={"user_id": "u1", **params})
+    assert response.status_code == 200
+    return response, [orjson.loads(line) for line in response.content.splitlines()]
+
+
+def test_export_streams_sessions_and_messages(store):
+    _, lines = export(TestClient(app))
+
+    assert [(line["type"], line.get("user")) for line in lines] == [
+        ("session", None), ("message", "q0"), ("message", "q1"), ("message", "q2"), ("message", "q3"),
+        ("session", None), ("message", "q4"), ("message", "q5")
+    ]
+
+
+@pytest.mark.parametrize("position", range(8))
+def test_cursor_resumes_right_after_its_line(store, position):
+    client = TestClient(app)
+    _, lines = export(client)
+
+    _, resumed = export(client, cursor=lines[position]["cursor"])
+
+    assert resumed == lines[position + 1:]
+
+
+# malformed base64, unknown keys ("foo:bar"), empty session key (":")
+@pytest.mark.parametrize("cursor", ["not-a-cursor!", "Zm9vOmJhcg", "Og"])
+def test_invalid_cursor_is_rejected(store, cursor):
+    response = TestClient(app).get(EXPORT, params={"user_id": "u1", "cursor": cursor})
+
+    assert response.status_code == 400
+
+
+def test_gzip_export_decompresses_to_the_plain_export(store):
+    client = TestClient(app)
+    plain, _ = export(client)
+
+    response = client.get(EXPORT, params={"user_id": "u1", "gzip": "true"})
+
+    assert response.headers["content-type"] == "application/gzip"
+    assert "content-encoding" not in response.headers
+    assert gzip.decompress(response.content) == plain.content
+
+
+def test_storage_error_before_the_first_line_is_a_500(store, monkeypatch):
+    def iter_sessions(user_id, start_key=None):
+        raise RuntimeError("database is locked")
+        yield
+    monkeypatch.setattr(store, "iter_sessions", iter_sessions)
+
+    response = TestClient(app).get(EXPORT, params={"user_id": "u1"})
+
+    assert response.status_code == 500
+
+
+def test_storage_error_mid_stream_ends_with_an_error_line(store, monkeypatch):
+    iter_messages = store.iter_messages
+
+    def failing_iter_messages(session_id, after_key=None):
+        yield from iter_messages(session_id, after_key)
+        if session_id == "s2":
+            raise RuntimeError("database is locked")
+    monkeypatch.setattr(store, "iter_messages", failing_iter_messages)
+
+    _, lines = export(TestClient(app))
+
+    assert [line["type"] for line in lines] == ["session"] + ["message"] * 4 + ["session", "message", "message", "error"]
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from app.utils import intents, llm
+from app.utils.intents import DEFAULT_INTENT_KEYWORDS, IntentMatcher, load_intent_keywords
+
+matcher = IntentMatcher(DEFAULT_INTENT_KEYWORDS)
+
+
+@pytest.mark.parametrize("text", ["hi there", "Hi!", "oh, hi.", "HELLO", "good   morning team"])
+def test_greetings_match_as_whole_words(text):
+    assert matcher.classify(text) == {"greeting"}
+
+
+@pytest.mark.parametrize("text", ["this is broken", "which one?", "shipping", "they said", "chill"])
+def test_keywords_do_not_match_inside_words(text):
+    assert matcher.classify(text) == frozenset()
+
+
+def test_several_intents_in_one_prompt():
+    assert matcher.classify("Hey, who made you?") == {"greeting", "creator"}
+
+
+def test_language_specific_keywords():
+    assert matcher.classify("नमस्ते, आपको किसने बनाया?", "hi") == {"greeting", "creator"}
+    assert matcher.classify("bonjour", "fr") == {"greeting"}
+    # English keywords apply to every language, other languages' only to their own
+    assert matcher.classify("hello", "fr") == {"greeting"}
+    assert matcher.classify("bonjour", "de") == frozenset()
+
+
+def test_devanagari_words_are_not_split_on_combining_marks():
+    assert matcher.classify("नमस्तेजी", "hi") == frozenset()
+
+
+def test_unknown_language_uses_english_keywords():
+    assert matcher.classify("hi", "xx") == {"greeting"}
+    assert matcher.classify("hola", "xx") == frozenset()
+
+
+def test_json_file_overrides_and_extends_keywords(monkeypatch, tmp_path):
+    path = tmp_path / "intents.json"
+    path.write_text(json.dumps({
+        "greeting": {"en": ["howdy"]},
+        "farewell": {"en": ["goodbye", "see you"]}
+    }), encoding="utf-8")
+    monkeypatch.setattr(intents.config, "INTENT_KEYWORDS_PATH", str(path))
+
+    custom = IntentMatcher(load_intent_keywords())
+
+    assert custom.classify("howdy") == {"greeting"}
+    assert custom.classify("hello") == frozenset()  # the "en" list was replaced
+    assert custom.classify("hola", "es") == {"greeting"}  # other languages kept
+    assert custom.classify("ok, see you") == {"farewell"}
+
+
+def test_system_prompt_follows_intents():
+    greeting = llm.get_system_prompt("en", "hi there")
+    plain = llm.get_system_prompt("en", "this is broken")
+
+    assert "User greeted you" in greeting
+    assert "User greeted you" not in plain
+    assert "creator" in llm.get_system_prompt("en", "who made you?")
+    assert "Always reply in Hindi" in llm.get_system_prompt("hi", "नमस्ते")
+
+
+def test_system_prompt_is_memoized_per_language_and_intents():
+    llm.build_system_prompt.cache_clear()
+
+    first = llm.get_system_prompt("en", "hello")
+    second = llm.get_system_prompt("en", "hey, how are you?")
+    other_language = llm.get_system_prompt("fr", "bonjour")
+
+    assert second is first
+    assert other_language is not first
+    info = llm.build_system_prompt.cache_info()
+    assert (info.hits, info.misses) == (1, 2)
@@ -0,0 +1,115 @@
+import asyncio
+import json
+from collections import defaultdict
+
+import aiohttp
+import pytest
+
+from app.utils import llm
+from app.utils.usage import COUNTER_FIELDS, usage_tracker
+
+
+class FakeResponse:
+    def __init__(self, status, lines):
+        self.status = status
+        self.content = self._lines(lines)
+
+    async def _lines(self, lines):
+        for line in lines:
+            yield line.encode("utf-8")
+
+    async def text(self):
+        return "error"
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    def __init__(self, response=None, error=None, **kwargs):
+        self.response = response
+        self.error = error
+
+    def post(self, url, **kwargs):
+        if self.error:
+            raise self.error
+        return self.response
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def stream_with(monkeypatch, **session):
+    monkeypatch.setattr(llm.aiohttp, "ClientSession", lambda **kwargs: FakeSession(**session))
+    monkeypatch.setattr(usage_tracker, "_pending", defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0)))
+
+    async def run():
+        return [delta async for delta in llm.stream_llm_response("hello", session_id="s1", language="en")]
+    return run
+
+
+def test_successful_stream_records_usage(monkeypatch):
+    lines = [
+        "data: " + json.dumps({"choices": [{"delta": {"content": "Hi"}}]}),
+        "data: " + json.dumps({"choices": [], "usage": {"prompt_tokens": 5, "completion_tokens": 2}}),
+        "data: [DONE]"
+    ]
+    run = stream_with(monkeypatch, response=FakeResponse(200, lines))
+
+    assert asyncio.run(run()) == ["Hi"]
+    [counters] = usage_tracker._pending.values()
+    assert (counters["calls"], counters["prompt_tokens"], counters["completion_tokens"]) == (1, 5, 2)
+
+
+def test_rejected_stream_records_no_usage(monkeypatch):
+    run = stream_with(monkeypatch, response=FakeResponse(429, []))
+
+    assert asyncio.run(run()) == []
+    assert not usage_tracker._pending
+
+
+def test_connection_error_records_no_usage(monkeypatch):
+    run = stream_with(monkeypatch, error=aiohttp.ClientConnectionError("refused"))
+
+    with pytest.raises(aiohttp.ClientConnectionError):
+        asyncio.run(run())
+    assert not usage_tracker._pending
+
+
+class FakeRequestsResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+def query_with(monkeypatch, body):
+    monkeypatch.setattr(llm.requests, "post", lambda *args, **kwargs: FakeRequestsResponse(body))
+    monkeypatch.setattr(llm, "_fall_back_to_groq", lambda *args: "groq answer")
+    monkeypatch.setattr(usage_tracker, "_pending", defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0)))
+    return llm.query_llm("hello", model="openrouter-mistral", session_id="s1", language="en", format="raw")
+
+
+def test_query_records_openrouter_usage(monkeypatch):
+    body = {"choices": [{"message": {"content": "Hi"}}], "usage": {"prompt_tokens": 4, "completion_tokens": 1}}
+
+    assert query_with(monkeypatch, body) == "Hi"
+    [(key, counters)] = usage_tracker._pending.items()
+    assert key[2] == "openrouter" and counters["prompt_tokens"] == 4
+
+
+def test_query_error_body_records_no_openrouter_usage(monkeypatch):
+    body = {"error": {"code": 429, "message": "Rate limit exceeded"}}
+
+    assert query_with(monkeypatch, body) == "groq answer"
+    assert not usage_tracker._pending
@@ -0,0 +1,87 @@
+from datetime import datetime
+
+from app.services import migrate_history
+from app.services.history_schema import (
+    HISTORY_SCHEMA_VERSION,
+    compact_legacy_doc,
+    get_final_response,
+    get_llm_response,
+    get_translated_prompt,
+    get_user_prompt,
+    render_html
+)
+from tests.conftest import make_mongo_repository
+
+AT = datetime(2025, 6, 1, 12, 0)
+
+
+def legacy_doc(_id, llm_response, final_response=None, user_prompt="hello", translated_prompt=None):
+    """A version 1 chat_history document as the app used to store it"""
+    return {
+        "_id": _id,
+        "session_id": "s1",
+        "user_id": "u1",
+        "user_prompt": user_prompt,
+        "translated_prompt": translated_prompt or user_prompt,
+        "llm_response": llm_response,
+        "final_response": final_response if final_response is not None else render_html(llm_response, "en"),
+        "language": "en",
+        "timestamp": AT
+    }
+
+
+LEGACY_DOCS = [
+    legacy_doc(1, "**Hi** there"),
+    legacy_doc(2, "Namaste", final_response="<p>Custom HTML</p>", user_prompt="नमस्ते", translated_prompt="Hello"),
+    legacy_doc(3, "", final_response="Chat generation was stopped by user", user_prompt="[SYSTEM]"),
+    legacy_doc(4, "long answer " * 500)
+]
+
+
+def test_compact_doc_reads_back_like_the_legacy_doc():
+    for doc in LEGACY_DOCS:
+        compact = compact_legacy_doc(doc)
+
+        assert compact["_id"] == doc["_id"]
+        assert compact["schema_version"] == HISTORY_SCHEMA_VERSION
+        assert get_user_prompt(compact) == doc["user_prompt"]
+        assert get_translated_prompt(compact) == doc["translated_prompt"]
+        assert get_llm_response(compact) == doc["llm_response"]
+        assert get_final_response(compact) == doc["final_response"]
+        assert compact["timestamp"] == AT
+
+
+def test_compact_doc_drops_only_redundant_fields():
+    rendered, custom, system, long = (compact_legacy_doc(doc) for doc in LEGACY_DOCS)
+
+    assert "final_response" not in rendered and "translated_prompt" not in rendered
+    assert custom["final_response"] == "<p>Custom HTML</p>" and custom["translated_prompt"] == "Hello"
+    assert system["final_response"] == "Chat generation was stopped by user"
+    assert "llm_response_z" in long and "llm_response" not in long
+
+
+def run_migration(monkeypatch, **kwargs):
+    repository = make_mongo_repository()
+    repository.history.insert_many([dict(doc) for doc in LEGACY_DOCS])
+    monkeypatch.setattr(migrate_history, "create_mongo_repository", lambda: repository)
+    return repository, migrate_history.migrate_history(batch_size=3, **kwargs)
+
+
+def test_migration_rewrites_legacy_documents(monkeypatch):
+    repository, stats = run_migration(monkeypatch)
+
+    assert stats["documents"] == len(LEGACY_DOCS)
+    assert stats["bytes_saved"] > 0
+    stored = {doc["_id"]: doc for doc in repository.history.find()}
+    for doc in LEGACY_DOCS:
+        assert stored[doc["_id"]] == compact_legacy_doc(doc)
+
+    # Already compact documents are left alone
+    assert migrate_history.migrate_history(batch_size=3)["documents"] == 0
+
+
+def test_dry_run_reports_without_writing(monkeypatch):
+    repository, stats = run_migration(monkeypatch, dry_run=True)
+
+    assert stats["documents"] == len(LEGACY_DOCS)
+    assert sorted(repository.history.find(), key=lambda doc: doc["_id"]) == LEGACY_DOCS
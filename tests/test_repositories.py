@@ -0,0 +1,163 @@
+# Conformance suite: every ChatRepository backend must pass these unchanged.
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from app.services.history_schema import build_history_doc, get_llm_response, get_user_prompt
+
+START = datetime(2026, 1, 1)
+
+
+def save(repository, session_id, index, user_id="u1", response=None):
+    at = START + timedelta(minutes=index)
+    repository.save_turn(
+        build_history_doc(session_id, user_id, f"q{index}", f"q{index}", response or f"a{index}", "en", at),
+        session_id=session_id, user_id=user_id, title=f"title {session_id}", created_at=at,
+        preview=f"a{index}"
+    )
+
+
+def test_recent_history_newest_first_and_limited(repository):
+    for i in range(5):
+        save(repository, "s1", i)
+    save(repository, "other", 9)
+
+    history = repository.recent_history("s1", limit=3)
+
+    assert [get_user_prompt(doc) for doc in history] == ["q4", "q3", "q2"]
+
+
+def test_compressed_bodies_round_trip(repository):
+    long_answer = "word " * 2000
+    save(repository, "s1", 0, response=long_answer)
+
+    [doc] = repository.recent_history("s1")
+
+    assert "llm_response_z" in doc
+    assert get_llm_response(doc) == long_answer
+
+
+def test_list_sessions_by_recent_activity_with_summaries(repository):
+    save(repository, "old", 0)
+    save(repository, "new", 1)
+    save(repository, "old", 2)
+    save(repository, "someone-else", 3, user_id="u2")
+
+    sessions = repository.list_sessions("u1")
+
+    assert [s["id"] for s in sessions] == ["old", "new"]
+    assert sessions[0]["message_count"] == 2
+    assert sessions[0]["last_preview"] == "a2"
+    assert sessions[0]["last_message_at"] == START + timedelta(minutes=2)
+    assert sessions[0]["title"] == "title old"
+    assert sessions[0]["created_at"] == START
+
+
+def test_out_of_order_turn_does_not_move_summary_back(repository):
+    save(repository, "s1", 0)
+    save(repository, "s1", 5)
+    save(repository, "s1", 2)  # committed late
+
+    [session] = repository.list_sessions("u1")
+
+    assert session["message_count"] == 3
+    assert session["last_message_at"] == START + timedelta(minutes=5)
+    assert session["last_preview"] == "a5"
+    assert session["created_at"] == START
+
+
+def test_summary_values_are_stored_literally(repository):
+    save(repository, "s1", 0)
+    repository.save_turn(
+        build_history_doc("s1", "u1", "q", "q", "$last_preview", "en", START + timedelta(minutes=1)),
+        session_id="s1", user_id="u1", title="$title", created_at=START, preview="$last_preview"
+    )
+
+    [session] = repository.list_sessions("u1")
+
+    assert session["last_preview"] == "$last_preview"
+    assert session["title"] == "title s1"
+
+
+def test_backfill_recomputes_summaries(repository):
+    for i in range(3):
+        save(repository, "s1", i)
+    repository.insert_history_many([
+        build_history_doc("s1", "u1", "q9", "q9", "late answer", "en", START + timedelta(minutes=9))
+    ])
+
+    assert repository.backfill_session_summaries() >= 1
+
+    [session] = repository.list_sessions("u1")
+    assert session["message_count"] == 4
+    assert session["last_preview"] == "late answer"
+    assert session["last_message_at"] == START + timedelta(minutes=9)
+
+
+def test_iter_sessions_resumes_inclusively(repository):
+    for i, session_id in enumerate(["a", "b", "c", "d"]):
+        save(repository, session_id, i)
+
+    sessions = list(repository.iter_sessions("u1"))
+    resumed = list(repository.iter_sessions("u1", start_key=sessions[2]["key"]))
+
+    assert [s["id"] for s in sessions] == ["a", "b", "c", "d"]
+    assert [s["id"] for s in resumed] == ["c", "d"]
+    assert all(repository.is_valid_key(s["key"]) for s in sessions)
+
+
+def test_iter_messages_resumes_after_key(repository):
+    for i in range(7):
+        save(repository, "s1", i)
+
+    messages = list(repository.iter_messages("s1"))
+    resumed = list(repository.iter_messages("s1", after_key=messages[3]["key"]))
+
+    assert [get_user_prompt(m) for m in messages] == [f"q{i}" for i in range(7)]
+    assert [get_user_prompt(m) for m in resumed] == ["q4", "q5", "q6"]
+
+
+def test_iterators_survive_thread_hops(repository):
+    # StreamingResponse advances sync iterators from arbitrary worker threads
+    for i in range(7):
+        save(repository, "s1", i)
+
+    # batch_size is 3, so the 4th item's fetch runs on a different thread
+    # than the one that opened the cursor, as does close()
+    iterator = repository.iter_messages("s1")
+    pools = [ThreadPoolExecutor(max_workers=1) for _ in range(2)]
+    try:
+        prompts = [get_user_prompt(pools[i % 2].submit(next, iterator).result()) for i in range(4)]
+        pools[1].submit(iterator.close).result()
+    finally:
+        for pool in pools:
+            pool.shutdown()
+
+    assert prompts == ["q0", "q1", "q2", "q3"]
+
+
+def test_invalid_keys_rejected(repository):
+    assert not repository.is_valid_key("not a key!")
+
+
+def test_apply_usage_merges_counters(repository):
+    row = {
+        "user_id": "u1", "session_id": "s1", "provider": "openrouter", "calls": 1,
+        "prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15,
+        "translated_chars": 0, "latency_ms": 100.0
+    }
+    repository.apply_usage([row])
+    repository.apply_usage([
+        dict(row, prompt_tokens=2, completion_tokens=3, total_tokens=5, latency_ms=50.0),
+        dict(row, user_id="u2", total_tokens=100)
+    ])
+
+    heaviest_first = repository.get_usage()
+    [merged] = repository.get_usage(user_id="u1", session_id="s1")
+
+    assert [r["user_id"] for r in heaviest_first] == ["u2", "u1"]
+    assert merged["calls"] == 2
+    assert merged["prompt_tokens"] == 12
+    assert merged["completion_tokens"] == 8
+    assert merged["total_tokens"] == 20
+    assert merged["latency_ms"] == 150.0
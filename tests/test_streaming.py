@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from app.utils.streaming import FlushPolicy, coalesce_chunks
+
+
+async def deltas(items, error=None):
+    for item in items:
+        yield item
+    if error:
+        raise error
+
+
+def collect(source, policy):
+    async def run():
+        return [chunk async for chunk in coalesce_chunks(source, policy)]
+    return asyncio.run(run())
+
+
+def test_fence_split_across_deltas_flushes():
+    policy = FlushPolicy(mode="coalesce", min_bytes=1024, max_delay_ms=10_000)
+
+    chunks = collect(deltas(["text ", "``", "`", "py", "thon"]), policy)
+
+    assert chunks == ["text ```", "python"]
+
+
+def test_buffer_is_flushed_before_upstream_error():
+    policy = FlushPolicy(mode="coalesce", min_bytes=1024, max_delay_ms=10_000)
+    received = []
+
+    async def run():
+        async for chunk in coalesce_chunks(deltas(["partial ", "answer"], RuntimeError("upstream")), policy):
+            received.append(chunk)
+
+    with pytest.raises(RuntimeError, match="upstream"):
+        asyncio.run(run())
+    assert received == ["partial answer"]
+
+
+def test_whitespace_after_a_flushed_fence_is_buffered():
+    policy = FlushPolicy(mode="coalesce", min_bytes=1024, max_delay_ms=10_000)
+
+    chunks = collect(deltas(["a ```", " ", " ", " ", "x y"]), policy)
+
+    assert chunks == ["a ```", "   x y"]
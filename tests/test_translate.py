@@ -0,0 +1,33 @@
+from app.utils import translate
+
+
+class FakeClient:
+    def __init__(self):
+        self.requests = []
+
+    def translate(self, values, target_language, format_):
+        self.requests.append(list(values))
+        return [{"translatedText": f"[{target_language}]{value}"} for value in values]
+
+
+def test_whitespace_only_text_is_returned_unchanged(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(translate, "translate_client", client)
+
+    assert translate.translate_text("  \n\n ", "hi") == "  \n\n "
+    assert translate.translate_text("", "hi") == ""
+    assert client.requests == []
+
+
+def test_long_text_keeps_layout_and_sends_no_empty_segments(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(translate, "translate_client", client)
+    monkeypatch.setattr(translate, "detect_language", lambda text: "en")
+    monkeypatch.setattr(translate, "translation_cache", translate.TranslationCache(100))
+    monkeypatch.setattr(translate.config, "TRANSLATE_SEGMENT_CHARS", 25)
+    text = "First paragraph here.\n\n   \n\n```\ncode()\n```\nSecond one."
+
+    result = translate.translate_text(text, "hi")
+
+    assert result == "[hi]First paragraph here.\n\n   \n\n```\ncode()\n```\n[hi]Second one."
+    assert all(segment.strip() for request in client.requests for segment in request)
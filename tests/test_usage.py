@@ -0,0 +1,59 @@
+import pytest
+from pymongo.errors import BulkWriteError
+
+from app.repositories.base import PartialUsageWrite
+from app.utils.usage import COUNTER_FIELDS, UsageTracker
+from tests.conftest import make_mongo_repository
+
+
+class FlakyRepository:
+    def __init__(self, error):
+        self.error = error
+        self.applied = []
+
+    def apply_usage(self, rows):
+        if self.error:
+            error, self.error = self.error(rows), None
+            raise error
+        self.applied.extend(rows)
+
+
+def flush_twice(monkeypatch, error):
+    repository = FlakyRepository(error)
+    monkeypatch.setattr("app.repositories.factory.get_repository", lambda: repository)
+    tracker = UsageTracker()
+    tracker.record("openrouter", prompt_tokens=3, user_id="u1", session_id="s1")
+    tracker.record("groq", prompt_tokens=5, user_id="u1", session_id="s1")
+    first = tracker.flush()
+    second = tracker.flush()
+    return first, second, repository.applied
+
+
+def test_failed_flush_requeues_every_row(monkeypatch):
+    first, second, applied = flush_twice(monkeypatch, lambda rows: RuntimeError("down"))
+
+    assert (first, second) == (0, 2)
+    assert sorted(row["prompt_tokens"] for row in applied) == [3, 5]
+
+
+def test_partial_flush_requeues_only_failed_rows(monkeypatch):
+    first, second, applied = flush_twice(monkeypatch, lambda rows: PartialUsageWrite(rows[1:]))
+
+    assert (first, second) == (1, 1)
+    assert [(row["provider"], row["calls"]) for row in applied] == [("groq", 1)]
+
+
+def test_mongo_reports_failed_rows_of_bulk_write(monkeypatch):
+    repository = make_mongo_repository()
+    rows = [
+        {"user_id": "u1", "session_id": "s1", "provider": provider, **dict.fromkeys(COUNTER_FIELDS, 1)}
+        for provider in ("openrouter", "groq", "google_translate")
+    ]
+
+    def bulk_write(operations, ordered):
+        raise BulkWriteError({"writeErrors": [{"index": 1, "code": 11000, "errmsg": "duplicate"}]})
+    monkeypatch.setattr(repository.usage, "bulk_write", bulk_write)
+
+    with pytest.raises(PartialUsageWrite) as error:
+        repository.apply_usage(rows)
+    assert error.value.failed_rows == [rows[1]]